@@ -1,6 +1,7 @@
 ### DjangoProject/DjangoProject/settings.py
 
 import os
+import tempfile
 from pathlib import Path
 from environ import Env
 import logging
@@ -31,7 +32,9 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS')
 
 # Application definition
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Без autodiscover при старте: admin.py приложений загружаются с URL админки (DjangoProject/urls.py)
+    # или при системных проверках (myapp/apps.py)
+    'myapp.apps.LazyAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -46,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'myapp.middleware.MetricsMiddleware',
     'myapp.middleware.LogRequestMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -54,6 +58,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Последним: считает запросы view, а не middleware выше (myapp/middleware.py)
+    'myapp.middleware.DBTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'DjangoProject.urls'
@@ -164,7 +170,7 @@ CSRF_COOKIE_NAME = 'myapp_csrftoken'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'myapp.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         # 'rest_framework.permissions.IsAuthenticated',
@@ -174,6 +180,71 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 5,
 }
 
+# Превышение query_budget во view (myapp/mixins.py): 'log' — предупреждение в лог, 'raise' — исключение
+QUERY_BUDGET_MODE = env('QUERY_BUDGET_MODE', default='log')
+
+# Максимальный размер пакета для tasks/bulk/ и subtasks/bulk/
+BULK_MAX_ITEMS = env.int('BULK_MAX_ITEMS', default=1000)
+
+# Размер пачки при потоковой выгрузке tasks/export/ и subtasks/export/
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# Списки задач и подзадач через values() без экземпляров моделей (myapp.mixins.ValuesListMixin)
+FAST_LIST_SERIALIZATION = env.bool('FAST_LIST_SERIALIZATION', default=False)
+
+# Кэш имя -> id категорий в процессе (myapp/categories.py): размер и время жизни записи, с
+CATEGORY_CACHE_SIZE = env.int('CATEGORY_CACHE_SIZE', default=1000)
+CATEGORY_CACHE_TTL = env.int('CATEGORY_CACHE_TTL', default=300)
+
+# Метрики /metrics (myapp/metrics.py): каталог файлов процессов (пусто — только текущий процесс),
+# период записи снимка, с, и токен доступа. По умолчанию каталог вне репозитория.
+# Без токена /metrics закрыт (403); METRICS_PUBLIC=True открывает его без проверки —
+# только если доступ уже ограничен снаружи (внутренняя сеть, прокси)
+METRICS_DIR = env('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'myapp-metrics'))
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=5.0)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_PUBLIC = env.bool('METRICS_PUBLIC', default=False)
+
+# Учёт SQL на запрос (myapp.middleware.DBTimingMiddleware): доля запросов в выборке (0..1),
+# заголовок Server-Timing, пороги предупреждения в лог (пусто — без предупреждения)
+DB_TIMING_SAMPLE_RATE = env.float('DB_TIMING_SAMPLE_RATE', default=1.0)
+DB_TIMING_HEADER = env.bool('DB_TIMING_HEADER', default=True)
+DB_TIMING_SLOW_MS = env.float('DB_TIMING_SLOW_MS', default=None)
+DB_TIMING_MAX_QUERIES = env.int('DB_TIMING_MAX_QUERIES', default=None)
+
+# Лог медленных SQL (myapp/slowqueries.py): порог, мс (пусто — выключен), доля остальных запросов
+# в лог (0..1), EXPLAIN для медленных SELECT. env.float пустое значение не принимает — разбираем сами
+_slow_query_ms = env.str('SLOW_QUERY_MS', default='100').strip()
+SLOW_QUERY_MS = float(_slow_query_ms) if _slow_query_ms else None
+SLOW_QUERY_SAMPLE_RATE = env.float('SLOW_QUERY_SAMPLE_RATE', default=0.0)
+SLOW_QUERY_EXPLAIN = env.bool('SLOW_QUERY_EXPLAIN', default=False)
+
+# JWT (myapp/authentication.py): размер кэша проверенных токенов, TTL кэша пользователей, с,
+# пользователь из claims токена без запроса к БД
+JWT_TOKEN_CACHE_SIZE = env.int('JWT_TOKEN_CACHE_SIZE', default=10000)
+JWT_USER_CACHE_TTL = env.int('JWT_USER_CACHE_TTL', default=60)
+JWT_USER_FROM_CLAIMS = env.bool('JWT_USER_FROM_CLAIMS', default=False)
+
+# Отзыв refresh-токенов (myapp/blacklist.py): фильтр Блума — ёмкость и доля ложных срабатываний,
+# периоды подгрузки новых отзывов и полной перестройки, с; пакетная запись OutstandingToken
+JWT_BLACKLIST_CAPACITY = env.int('JWT_BLACKLIST_CAPACITY', default=100000)
+JWT_BLACKLIST_ERROR_RATE = env.float('JWT_BLACKLIST_ERROR_RATE', default=0.001)
+JWT_BLACKLIST_SYNC_INTERVAL = env.float('JWT_BLACKLIST_SYNC_INTERVAL', default=1.0)
+JWT_BLACKLIST_SYNC_OVERLAP = env.int('JWT_BLACKLIST_SYNC_OVERLAP', default=100)
+JWT_BLACKLIST_REBUILD_INTERVAL = env.float('JWT_BLACKLIST_REBUILD_INTERVAL', default=3600.0)
+JWT_OUTSTANDING_BATCH_SIZE = env.int('JWT_OUTSTANDING_BATCH_SIZE', default=100)
+JWT_OUTSTANDING_FLUSH_INTERVAL = env.float('JWT_OUTSTANDING_FLUSH_INTERVAL', default=5.0)
+
+# Схема OpenAPI (myapp/schema.py): каталог файлов от generate_openapi_schema
+# (пусто — схема строится один раз на процесс при первом запросе)
+OPENAPI_SCHEMA_DIR = env('OPENAPI_SCHEMA_DIR', default='')
+
+# Прогрев воркера (myapp/warmup.py): запуск из wsgi.py/asgi.py и шаги по порядку;
+# /readyz отвечает 200 только после всех шагов
+WARMUP_ON_START = env.bool('WARMUP_ON_START', default=True)
+WARMUP_STEPS = env.list('WARMUP_STEPS', default=['urls', 'database', 'serializers', 'password_validators',
+                                                 'authentication'])
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -181,6 +252,8 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ("rest_framework_simplejwt.tokens.AccessToken",),
+    'TOKEN_OBTAIN_SERIALIZER': 'myapp.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'myapp.blacklist.RotatingTokenRefreshSerializer',
 }
 
 LOGGING = {
@@ -200,16 +273,18 @@ LOGGING = {
             'formatter': 'verbose',
         },
         'http_file': {
-            'class': 'logging.FileHandler',
+            # Файл пишет фоновый поток — в потоке запроса нет файлового I/O
+            'class': 'myapp.log_handlers.BackgroundFileHandler',
             'filename': str(LOG_DIR / 'http_logs.log'),
             'formatter': 'verbose',
             'level': 'INFO',
         },
         'db_file': {
-            'class': 'logging.FileHandler',
+            # Только медленные и выборочные запросы (myapp/slowqueries.py), запись в фоне
+            'class': 'myapp.log_handlers.BackgroundFileHandler',
             'filename': str(LOG_DIR / 'db_logs.log'),
             'formatter': 'verbose',
-            'level': 'DEBUG',
+            'level': 'INFO',
         },
     },
 
@@ -223,9 +298,9 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
-        'django.db.backends': {
+        'myapp.slow_queries': {
             'handlers': ['db_file'],
-            'level': 'DEBUG',
+            'level': 'INFO',
             'propagate': False,
         },
         'http_logger': {
@@ -233,5 +308,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'myapp': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
@@ -1,37 +1,41 @@
 ### DjangoProject/DjangoProject/urls.py
 
+import functools
+
 from django.contrib import admin
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from django.urls import path, re_path, include
 
+from myapp import schema
+from myapp.metrics import metrics_view
+from myapp.warmup import readiness_view
 
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Task API",
-      default_version='v1',
-      description="API документация для Task Management System",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="support@example.com"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=[permissions.AllowAny],
-)
+class LazyAdminURLs:
+    """
+    URL админки для path('admin/', ...): регистрация моделей (admin.autodiscover) — при первом
+    обращении к /admin/ или reverse(), а не при старте воркера.
+    """
+
+    @functools.cached_property
+    def urlpatterns(self):
+        admin.autodiscover()
+        return admin.site.get_urls()
 
+
+# Документация: drf_yasg загружается при первом обращении (myapp/schema.py),
+# схема отдаётся готовым документом с ETag
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('admin/', (LazyAdminURLs(), 'admin', admin.site.name)),
     path('api/', include('myapp.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path('readyz', readiness_view, name='readiness'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^swagger\.(?P<format>json|yaml)$', schema.schema_document, name='schema-document'),
+    re_path(r'^swagger/$', schema.swagger_ui, name='schema-swagger-ui'),
+    re_path(r'^redoc/$', schema.redoc_ui, name='schema-redoc'),
 ]
-
-
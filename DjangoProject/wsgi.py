@@ -16,3 +16,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
 
 application = get_wsgi_application()
+
+# Прогрев до приёма трафика: URL, БД, сериализаторы, валидаторы паролей (myapp/warmup.py)
+from myapp.warmup import on_start  # noqa: E402
+
+on_start()
@@ -48,7 +48,7 @@ class SubTaskAdmin(admin.ModelAdmin):
     get_task_title.short_description = 'Task'
 
     def mark_as_done(self, request, queryset):
-        """Action для установки статуса 'Done' для выбранных подзадач"""
-        updated = queryset.update(status='Done')
+        """Action для установки статуса 'Done' для выбранных подзадач (со штампом для ETag и ленты изменений)"""
+        updated = queryset.update_status('Done')
         self.message_user(request, f"{updated} subtask(s) marked as Done.")
     mark_as_done.short_description = "Mark selected subtasks as Done"
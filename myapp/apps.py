@@ -1,8 +1,39 @@
 # DjangoProject/myapp/apps.py
 
 from django.apps import AppConfig
+from django.contrib import admin
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core import checks
 
 
 class MyappConfig(AppConfig):
+    # В модуле несколько AppConfig — для 'myapp' в INSTALLED_APPS выбирается этот
+    default = True
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from myapp import signals  # noqa: F401  регистрация обработчиков сигналов
+        from myapp.slowqueries import install
+
+        connection_created.connect(install, dispatch_uid='myapp.slowqueries')
+
+
+class LazyAdminConfig(SimpleAdminConfig):
+    """
+    Админка без autodiscover при старте: admin.py приложений загружаются с URL админки
+    (DjangoProject/urls.py). Проверки admin.E* для них при этом не теряются — системные
+    проверки (check, runserver, migrate, test) сначала загружают admin.py.
+    """
+
+    def ready(self):
+        checks.register(check_dependencies, checks.Tags.admin)
+        checks.register(check_lazy_admin, checks.Tags.admin)
+
+
+def check_lazy_admin(app_configs, **kwargs):
+    admin.autodiscover()
+    return check_admin_app(app_configs, **kwargs)
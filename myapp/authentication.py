@@ -0,0 +1,157 @@
+# myapp/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from myapp.blacklist import RefreshToken
+
+# Поля пользователя, которые кладём в токен и из которых собираем пользователя без БД
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser')
+
+
+class TokenCache:
+    """
+    Проверенные токены в памяти процесса: сырой токен -> (токен, exp).
+    LRU ограниченного размера; запись живёт до истечения токена.
+    Кэшируются только успешно проверенные токены — ошибки проверяются каждый раз.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[raw_token]
+                return None
+            self._entries.move_to_end(raw_token)
+            return entry[0]
+
+    def set(self, raw_token, token):
+        max_size = self.max_size if self.max_size is not None else getattr(settings, 'JWT_TOKEN_CACHE_SIZE', 10000)
+        if not max_size:
+            return
+        with self._lock:
+            self._entries[raw_token] = (token, token['exp'])
+            self._entries.move_to_end(raw_token)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class UserCache:
+    """
+    Пользователи по id в памяти процесса на JWT_USER_CACHE_TTL секунд.
+    Сохранение и удаление User сбрасывают запись (myapp/signals.py);
+    TTL ограничивает расхождение между процессами.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}  # str(id) -> (user, expires_at); в токене id — строка
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        entry = self._entries.get(str(pk))
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        # Копия: view может менять request.user, кэш делят потоки
+        return copy.copy(entry[0])
+
+    def set(self, user):
+        ttl = self.ttl if self.ttl is not None else getattr(settings, 'JWT_USER_CACHE_TTL', 60)
+        # Внутри транзакции пользователь может быть незакоммиченным — не кэшируем
+        if not ttl or connection.in_atomic_block:
+            return
+        with self._lock:
+            self._entries[str(user.pk)] = (copy.copy(user), time.monotonic() + ttl)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._entries.pop(str(pk), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без лишней работы на каждом запросе:
+    проверенный токен берётся из token_cache (подпись не проверяется повторно),
+    пользователь — из user_cache или, если JWT_USER_FROM_CLAIMS и в токене есть
+    USER_CLAIMS, собирается из claims без запроса к БД.
+
+    Пользователь из claims — настоящий User с отложенными остальными полями;
+    смена is_staff или блокировка видны ему только с новым токеном (не позже
+    ACCESS_TOKEN_LIFETIME), поэтому по умолчанию режим выключен.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if getattr(settings, 'JWT_USER_FROM_CLAIMS', False) and user_id is not None \
+                and all(claim in validated_token for claim in USER_CLAIMS):
+            return self.user_from_claims(validated_token)
+
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    def user_from_claims(self, validated_token):
+        model = get_user_model()
+        # В токене id — строка (simplejwt), в модели — тип поля
+        user_id = model._meta.get_field(api_settings.USER_ID_FIELD).to_python(validated_token[api_settings.USER_ID_CLAIM])
+        values = {
+            api_settings.USER_ID_FIELD: user_id,
+            'is_active': True,
+            **{claim: validated_token[claim] for claim in USER_CLAIMS},
+        }
+        # from_db ждёт значения в порядке полей модели
+        field_names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+        return model.from_db(router.db_for_read(model), field_names, [values[name] for name in field_names])
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Добавляет USER_CLAIMS в refresh-токен; access-токены (и при обновлении тоже) копируют их."""
+    token_class = RefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
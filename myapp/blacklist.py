@@ -0,0 +1,236 @@
+# myapp/blacklist.py
+
+import atexit
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+logger = logging.getLogger('myapp.blacklist')
+
+
+class BloomFilter:
+    """Фильтр Блума: «точно нет» или «возможно есть» с долей ложных срабатываний error_rate при capacity элементах."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class BlacklistFilter:
+    """
+    jti отозванных refresh-токенов в фильтре Блума в памяти процесса.
+    «Нет в фильтре» — токен не отозван, без запроса к БД; «возможно есть» — проверка по BlacklistedToken.
+
+    Отозванные в других процессах подтягиваются не чаще раза в JWT_BLACKLIST_SYNC_INTERVAL секунд
+    одним запросом по id > последнего виденного (с запасом JWT_BLACKLIST_SYNC_OVERLAP на
+    транзакции, закоммиченные не по порядку id); раз в JWT_BLACKLIST_REBUILD_INTERVAL фильтр
+    строится заново без истёкших токенов. Отозванные в этом процессе попадают в фильтр сразу.
+
+    «Нет в фильтре» окончательно, только пока фильтр свежий: последняя успешная подгрузка
+    не старше JWT_BLACKLIST_SYNC_INTERVAL. Если подгрузка не удалась, фильтр остаётся прежним,
+    но до следующей успешной ответ — «возможно есть», и решает запрос к БД.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._built_at = self._synced_at = 0.0
+
+    def _settings(self, name, default):
+        return getattr(settings, f'JWT_BLACKLIST_{name}', default)
+
+    def _load(self, queryset, bloom):
+        last_id = self._last_id
+        for pk, jti in queryset.values_list('pk', 'token__jti').iterator(chunk_size=5000):
+            bloom.add(jti)
+            last_id = max(last_id, pk)
+        return last_id
+
+    def _stale(self, now):
+        return self._bloom is None or now - self._synced_at >= self._settings('SYNC_INTERVAL', 1.0) or \
+            now - self._built_at >= self._settings('REBUILD_INTERVAL', 3600)
+
+    def _sync(self, now):
+        if self._bloom is None or now - self._built_at >= self._settings('REBUILD_INTERVAL', 3600):
+            bloom = BloomFilter(self._settings('CAPACITY', 100000), self._settings('ERROR_RATE', 0.001))
+            # Отсчёт — от последней записи вообще, а не последней неистёкшей
+            last_id = BlacklistedToken.objects.aggregate(last=Max('pk'))['last'] or 0
+            self._load(BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()), bloom)
+            self._bloom, self._last_id, self._built_at, self._synced_at = bloom, last_id, now, now
+        elif now - self._synced_at >= self._settings('SYNC_INTERVAL', 1.0):
+            overlap = self._settings('SYNC_OVERLAP', 100)
+            self._last_id = self._load(BlacklistedToken.objects.filter(pk__gt=self._last_id - overlap), self._bloom)
+            self._synced_at = now
+
+    def might_contain(self, jti):
+        now = time.monotonic()
+        with self._lock:
+            if self._stale(now):
+                try:
+                    # Внутри транзакции запроса — в точке сохранения, чтобы ошибка её не испортила
+                    with transaction.atomic() if connection.in_atomic_block else nullcontext():
+                        self._sync(now)
+                except DatabaseError:
+                    logger.exception('Failed to sync the blacklist filter')
+                if self._stale(now):
+                    return True  # фильтр не обновился — решает БД
+            return jti in self._bloom
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+
+
+class OutstandingBuffer:
+    """
+    Записи OutstandingToken для выданных refresh-токенов копятся в памяти и пишутся
+    одним bulk_create, когда набралось JWT_OUTSTANDING_BATCH_SIZE или старейшей записи
+    больше JWT_OUTSTANDING_FLUSH_INTERVAL секунд (и при выходе процесса).
+    Срок проверяет и фоновый поток — буфер пишется и без новых входов.
+    Для отзыва запись не нужна заранее: blacklist() создаёт её сам.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._oldest = None
+        self._flusher_pid = None
+
+    def add(self, token):
+        jti, exp = token[api_settings.JTI_CLAIM], token['exp']
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        row = OutstandingToken(user_id=user_id, jti=jti, token=str(token),
+                               created_at=token.current_time, expires_at=datetime_from_epoch(exp))
+        with self._lock:
+            self._pending.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = len(self._pending) >= getattr(settings, 'JWT_OUTSTANDING_BATCH_SIZE', 100) or self._expired()
+            if self._flusher_pid != os.getpid():
+                # Первый вызов или новый процесс после fork: свой поток, как у FileStore в myapp/metrics.py
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_loop, name='outstanding-flush', daemon=True).start()
+        if due:
+            # Запись не должна откатиться вместе с транзакцией запроса
+            transaction.on_commit(self.flush)
+
+    def _expired(self):
+        interval = getattr(settings, 'JWT_OUTSTANDING_FLUSH_INTERVAL', 5.0)
+        return self._oldest is not None and time.monotonic() - self._oldest >= interval
+
+    def flush_expired(self):
+        """Пишет буфер, если старейшей записи больше JWT_OUTSTANDING_FLUSH_INTERVAL секунд."""
+        with self._lock:
+            due = self._expired()
+        if due:
+            self.flush()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(getattr(settings, 'JWT_OUTSTANDING_FLUSH_INTERVAL', 5.0))
+            try:
+                self.flush_expired()
+            except DatabaseError:
+                logger.exception('Failed to write outstanding tokens')
+            finally:
+                # Соединение этого потока: между записями оно не нужно
+                connection.close()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending, self._oldest = self._pending, [], None
+        if rows:
+            # Уже созданные blacklist() записи пропускаются
+            OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def flush_at_exit(self):
+        try:
+            self.flush()
+        except DatabaseError:
+            pass  # при выходе БД может быть уже недоступна (например, удалена тестовая)
+
+
+blacklist_filter = BlacklistFilter()
+outstanding_tokens = OutstandingBuffer()
+atexit.register(outstanding_tokens.flush_at_exit)
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    RefreshToken simplejwt с быстрой проверкой отзыва (blacklist_filter)
+    и отложенной записью OutstandingToken (outstanding_tokens).
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        transaction.on_commit(lambda: blacklist_filter.add(jti))
+        # Без загрузки пользователя и get_or_create: id пользователя берём из токена,
+        # запись OutstandingToken могла уже появиться (outstanding_tokens) — тогда пропускается
+        row = OutstandingToken(user_id=self.payload.get(api_settings.USER_ID_CLAIM), jti=jti, token=str(self),
+                               created_at=self.current_time, expires_at=datetime_from_epoch(self.payload['exp']))
+        try:
+            OutstandingToken.objects.bulk_create([row], ignore_conflicts=True)
+        except IntegrityError:
+            pass
+        token_id = OutstandingToken.objects.filter(jti=jti).values_list('pk', flat=True).first()
+        if token_id is None:
+            # Пользователь уже удалён — как в simplejwt, запись без пользователя
+            return super().blacklist()
+        blacklisted = BlacklistedToken(token_id=token_id)
+        BlacklistedToken.objects.bulk_create([blacklisted], ignore_conflicts=True)
+        return blacklisted
+
+    def outstand(self):
+        outstanding_tokens.add(self)
+
+    @classmethod
+    def for_user(cls, user):
+        # Минуем BlacklistMixin.for_user с OutstandingToken.objects.create на каждый вход
+        token = super(tokens.BlacklistMixin, cls).for_user(user)
+        outstanding_tokens.add(token)
+        return token
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshToken
@@ -0,0 +1,210 @@
+# myapp/bulk.py
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from myapp import versions
+from myapp.models import SyncTrackedModel
+from myapp.permissions import IsOwner, allowed_ids, owner_filter
+
+
+class BulkWriteView(APIView):
+    """
+    Пакетная запись: POST — создать, PATCH — частично обновить (в каждом элементе есть id),
+    DELETE — удалить (список id). Весь пакет валидируется за один проход и пишется
+    через bulk_create / bulk_update. Ответ — результат по каждому элементу:
+
+        {"results": [{"index": 0, "status": 201, "id": 5},
+                     {"index": 1, "status": 400, "errors": {...}}]}
+
+    Невалидные элементы пропускаются, остальные записываются (тогда код ответа 207).
+    """
+    permission_classes = [IsAuthenticated, IsOwner]
+    model = None
+    serializer_class = None
+    batch_size = 500
+
+    def get_queryset(self):
+        # Права владельца — условием запроса (myapp/permissions.py), чужие id не находятся
+        queryset = self.model.objects.all()
+        condition = owner_filter(self.request, self, self.get_permissions())
+        return queryset if condition is None else queryset.filter(condition)
+
+    # --- Хуки для конкретных моделей ---
+
+    def resolve_relations(self, valid_items):
+        """Проверяет связи всего пакета разом. Возвращает {index: errors}."""
+        return {}
+
+    def assign(self, instance, data):
+        """Переносит провалидированные данные в объект. Возвращает изменённые поля модели."""
+        for field, value in data.items():
+            setattr(instance, field, value)
+        return list(data)
+
+    def after_create(self, instances, items, signals_sent):
+        pass
+
+    def after_update(self, instances, items, old_states):
+        pass
+
+    def snapshot(self, instance):
+        return None
+
+    def stamp(self, instances):
+        """
+        bulk_create / bulk_update не вызывают save() — штамп дельта-синхронизации
+        (одна версия владельца на пакет) ставим сами. Возвращает изменённые поля.
+        """
+        if not instances or not issubclass(self.model, SyncTrackedModel):
+            return []
+        version = versions.allocate(self.request.user.id)
+        now = timezone.now()
+        for instance in instances:
+            instance.sync_version = version
+            instance.updated_at = now
+        return list(SyncTrackedModel.SYNC_FIELDS)
+
+    def bump_versions(self, instances):
+        # bulk_create / bulk_update сигналов не шлют — версию владельца поднимаем сами
+        versions.bump([self.request.user.id])
+
+    # --- Обработчики ---
+
+    def post(self, request):
+        items = self.get_items(request)
+        results = [None] * len(items)
+        serializer = self.serializer_class(context={'request': request, 'view': self})
+        valid = self.validate_items(serializer, list(enumerate(items)), results)
+
+        with transaction.atomic(), versions.batch():
+            instances = []
+            for _, data in valid:
+                instance = self.model(owner=request.user)
+                self.assign(instance, data)
+                instances.append(instance)
+            self.stamp(instances)
+            signals_sent = self.bulk_insert(instances)
+            self.after_create(instances, valid, signals_sent)
+            if instances:
+                self.bump_versions(instances)
+
+        for (index, _), instance in zip(valid, instances):
+            results[index] = {'index': index, 'status': status.HTTP_201_CREATED, 'id': instance.pk}
+        return self.make_response(results, status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        items = self.get_items(request)
+        results = [None] * len(items)
+
+        ids = {}
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if isinstance(pk, int) and not isinstance(pk, bool):
+                ids[index] = pk
+            else:
+                results[index] = self.error(index, {'id': ['A valid integer is required.']})
+        existing = self.get_queryset().in_bulk(set(ids.values()))
+        candidates = []
+        for index, pk in ids.items():
+            if pk in existing:
+                candidates.append((index, items[index]))
+            else:
+                results[index] = self.error(index, {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+
+        serializer = self.serializer_class(partial=True, context={'request': request, 'view': self})
+        valid = self.validate_items(serializer, candidates, results)
+
+        with transaction.atomic(), versions.batch():
+            instances, old_states, fields = [], [], set()
+            for index, data in valid:
+                instance = existing[ids[index]]
+                old_states.append(self.snapshot(instance))
+                fields.update(self.assign(instance, data))
+                instances.append(instance)
+            fields.update(self.stamp(instances))
+            if instances and fields:
+                self.model.objects.bulk_update(instances, sorted(fields), batch_size=self.batch_size)
+            self.after_update(instances, valid, old_states)
+            if instances:
+                self.bump_versions(instances)
+
+        for (index, _), instance in zip(valid, instances):
+            results[index] = {'index': index, 'status': status.HTTP_200_OK, 'id': instance.pk}
+        return self.make_response(results, status.HTTP_200_OK)
+
+    def delete(self, request):
+        items = self.get_items(request)
+        results = [None] * len(items)
+        ids = {}
+        for index, pk in enumerate(items):
+            if isinstance(pk, int) and not isinstance(pk, bool):
+                ids[index] = pk
+            else:
+                results[index] = self.error(index, {'id': ['A valid integer is required.']})
+
+        with transaction.atomic(), versions.batch():
+            # Пакетная проверка прав: один запрос по pk/owner_id
+            found = allowed_ids(request, self, self.model.objects.all(), set(ids.values()))
+            self.perform_bulk_delete(self.model.objects.filter(pk__in=found))
+
+        for index, pk in ids.items():
+            if pk in found:
+                results[index] = {'index': index, 'status': status.HTTP_204_NO_CONTENT, 'id': pk}
+            else:
+                results[index] = self.error(index, {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+        return self.make_response(results, status.HTTP_200_OK)
+
+    # --- Вспомогательное ---
+
+    def get_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'detail': 'Expected a list of items.'})
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 1000)
+        if len(items) > max_items:
+            raise ValidationError({'detail': f'Too many items: {len(items)} (max {max_items}).'})
+        return items
+
+    def validate_items(self, serializer, items, results):
+        # Один экземпляр сериализатора на пакет — поля строятся один раз
+        valid = []
+        for index, item in items:
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except ValidationError as exc:
+                results[index] = self.error(index, exc.detail)
+        errors = self.resolve_relations(valid)
+        for index, detail in errors.items():
+            results[index] = self.error(index, detail)
+        return [(index, data) for index, data in valid if index not in errors]
+
+    def bulk_insert(self, instances):
+        """
+        bulk_create, если база возвращает id вставленных строк (SQLite, PostgreSQL).
+        На MySQL id из bulk_create не вернутся, а они нужны для связей — там save() по одной.
+        Возвращает True, если отработали сигналы post_save.
+        """
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+            return False
+        for instance in instances:
+            instance.save()
+        return True
+
+    def perform_bulk_delete(self, queryset):
+        queryset.delete()
+
+    def error(self, index, detail, code=status.HTTP_400_BAD_REQUEST):
+        return {'index': index, 'status': code, 'errors': detail}
+
+    def make_response(self, results, success_status):
+        if all(result['status'] < 400 for result in results):
+            return Response({'results': results}, status=success_status)
+        return Response({'results': results}, status=status.HTTP_207_MULTI_STATUS)
@@ -0,0 +1,130 @@
+# myapp/categories.py
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, Value, When
+
+from myapp.models import Category, Task
+
+_releasing = ContextVar('category_counts_releasing', default=False)
+
+
+class CategoryNameCache:
+    """
+    Кэш имя -> id активных (не удалённых) категорий в памяти процесса.
+    LRU с ограниченным размером и TTL: TTL ограничивает расхождение между процессами,
+    в своём процессе записи сбрасывают сигналы Category (myapp/signals.py).
+    Промахи не кэшируются — новая категория видна сразу.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # name -> (id, expires_at)
+        self._names = {}  # id -> name, чтобы сбросить старое имя при переименовании
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        max_size = self.max_size if self.max_size is not None else getattr(settings, 'CATEGORY_CACHE_SIZE', 1000)
+        ttl = self.ttl if self.ttl is not None else getattr(settings, 'CATEGORY_CACHE_TTL', 300)
+        return max_size, ttl
+
+    def resolve(self, names):
+        """{name: id} для найденных имён: промахи — одним запросом name__in."""
+        max_size, ttl = self._limits()
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for name in dict.fromkeys(names):
+                entry = self._entries.get(name)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(name)
+                    found[name] = entry[0]
+                else:
+                    missing.append(name)
+        if not missing:
+            return found
+
+        loaded = dict(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        found.update(loaded)
+        # Внутри транзакции могут быть незакоммиченные имена — их не кэшируем
+        if max_size and not connection.in_atomic_block:
+            with self._lock:
+                for name, pk in loaded.items():
+                    self._entries[name] = (pk, now + ttl)
+                    self._entries.move_to_end(name)
+                    self._names[pk] = name
+                while len(self._entries) > max_size:
+                    name, (pk, _) = self._entries.popitem(last=False)
+                    self._names.pop(pk, None)
+        return found
+
+    def invalidate(self, pk=None, name=None):
+        with self._lock:
+            old_name = self._names.pop(pk, None) if pk is not None else None
+            for key in {old_name, name} - {None}:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._names.pop(entry[0], None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._names.clear()
+
+
+category_names = CategoryNameCache()
+
+
+def adjust_task_counts(deltas):
+    """Прибавляет к Category.task_count: {category_id: delta}. Одинаковые дельты — одним UPDATE."""
+    grouped = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            grouped[delta].append(pk)
+    for delta, ids in grouped.items():
+        if delta > 0:
+            value = F('task_count') + delta
+        else:
+            # Счётчик с дрейфом не должен уйти в минус и сломать запись задачи. Проверка до вычитания:
+            # на MySQL столбец UNSIGNED и отрицательное промежуточное значение — уже ошибка
+            value = Case(When(task_count__gte=-delta, then=F('task_count') + delta), default=Value(0))
+        Category.all_objects.filter(pk__in=ids).update(task_count=value)
+
+
+def link_counts(links):
+    """{category_id: число связей} по queryset связующей таблицы."""
+    return dict(links.order_by().values_list('category_id').annotate(count=Count('pk')))
+
+
+def release_tasks(task_ids):
+    """Снимает со счётчиков все связи задач (до удаления самих связей)."""
+    counts = link_counts(Task.categories.through.objects.filter(task_id__in=task_ids))
+    adjust_task_counts({pk: -count for pk, count in counts.items()})
+
+
+def is_releasing():
+    return _releasing.get()
+
+
+@contextmanager
+def releasing_tasks(queryset):
+    """
+    Удаление queryset задач: связи снимаются заранее одним запросом,
+    а pre_delete отдельных задач (myapp/signals.py) их уже не трогает.
+    """
+    if _releasing.get():
+        yield
+        return
+    release_tasks(queryset.values('pk'))
+    token = _releasing.set(True)
+    try:
+        yield
+    finally:
+        _releasing.reset(token)
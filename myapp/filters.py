@@ -0,0 +1,30 @@
+# myapp/filters.py
+
+from django.db import connection
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.settings import api_settings
+
+from myapp import search
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ?search= по полнотекстовому индексу (myapp/search.py) вместо LIKE '%term%'.
+    Результаты ранжируются по релевантности, если явно не передан ?ordering=.
+    Для баз без индекса (и коротких слов в MySQL) — обычный SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not search.is_supported(queryset, terms, connection):
+            return super().filter_queryset(request, queryset, view)
+        return search.search(queryset, terms, connection).order_by('-search_rank')
+
+    def get_ordering(self, request, queryset, view):
+        # CursorPagination берёт сортировку у первого фильтра с get_ordering — это мы,
+        # поэтому без поиска отдаём то, что вернул бы OrderingFilter
+        if (self.get_search_terms(request)
+                and api_settings.ORDERING_PARAM not in request.query_params
+                and 'search_rank' in queryset.query.annotations):
+            return ('-search_rank',)
+        return OrderingFilter().get_ordering(request, queryset, view)
@@ -0,0 +1,70 @@
+# myapp/log_handlers.py
+
+import copy
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BackgroundFileHandler(QueueHandler):
+    """
+    Запись лога в файл в фоновом потоке: в потоке запроса запись только кладётся
+    в очередь (QueueHandler), файл пишет QueueListener. Форматирование — тоже в фоне.
+
+    Очередь ограничена queue_size: если диск не успевает, лишние записи
+    отбрасываются (счётчик dropped), а не тормозят запросы.
+    После fork (gunicorn --preload) поток-писатель запускается заново в дочернем процессе.
+    """
+
+    def __init__(self, filename, mode='a', encoding='utf-8', delay=True, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.queue_size = queue_size
+        self.target = logging.FileHandler(filename, mode=mode, encoding=encoding, delay=delay)
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Поток из родительского процесса после fork не существует — новая очередь и новый писатель
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.listener = QueueListener(self.queue, self.target)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Только подставляем аргументы (они могут измениться позже); форматирует фоновый поток
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        # logging.shutdown() при выходе: дописываем очередь и закрываем файл
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self._pid = None
+        self.target.close()
+        super().close()
@@ -0,0 +1,32 @@
+# myapp/management/commands/generate_openapi_schema.py
+
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import schema
+
+
+class Command(BaseCommand):
+    help = ('Генерирует схему OpenAPI (JSON и YAML) в OPENAPI_SCHEMA_DIR. Запускать при деплое: '
+            'воркеры отдают готовый файл, а не строят схему по view и сериализаторам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Каталог (по умолчанию OPENAPI_SCHEMA_DIR).')
+
+    def handle(self, *args, **options):
+        directory = options['output'] or getattr(settings, 'OPENAPI_SCHEMA_DIR', None)
+        if not directory:
+            raise CommandError('Set OPENAPI_SCHEMA_DIR or pass --output.')
+        os.makedirs(directory, exist_ok=True)
+        for format in schema.FORMATS:
+            content = schema.generate(format)
+            # Атомарная замена: работающие воркеры не прочитают файл наполовину
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp, os.path.join(directory, f'openapi.{format}'))
+            self.stdout.write(f'openapi.{format}: {len(content)} bytes')
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {directory}.'))
@@ -0,0 +1,200 @@
+# myapp/management/commands/generate_synthetic_data.py
+
+import io
+import itertools
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from myapp import synthetic
+from myapp.models import Category, OwnerVersion, SubTask, Task
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными объёма рабочей: пользователи, задачи и подзадачи '
+            'с реалистичными статусами и дедлайнами, связи с категориями, данные приложения library. '
+            'Пачки вставляются bulk_create в параллельных процессах; при одинаковом --seed на пустой '
+            'базе результат одинаковый. Запускать на базе без другой нагрузки: id резервируются заранее.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=100000)
+        parser.add_argument('--subtasks-per-task', type=float, default=2.0, help='Среднее число подзадач.')
+        parser.add_argument('--max-subtasks', type=int, default=10)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--max-categories', type=int, default=3, help='Максимум категорий у задачи.')
+        parser.add_argument('--days', type=int, default=365, help='Глубина истории в днях.')
+        parser.add_argument('--books', type=int, default=None, help='По умолчанию 10000, если library установлено.')
+        parser.add_argument('--members', type=int, default=None, help='По умолчанию 5000, если library установлено.')
+        parser.add_argument('--borrows', type=int, default=None, help='По умолчанию 50000, если library установлено.')
+        parser.add_argument('--libraries', type=int, default=20)
+        parser.add_argument('--prefix', default='synthetic', help='Префикс имён пользователей, категорий и email.')
+        parser.add_argument('--password', default='synthetic', help='Пароль всех созданных пользователей.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, 8))
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Строк в одной пачке (транзакции).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='batch_size для bulk_create.')
+        parser.add_argument('--skip-counters', action='store_true',
+                            help='Не пересчитывать TaskStats и Category.task_count после вставки.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        library = self.library_counts(options)
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # У SQLite один писатель: параллельные транзакции упираются в «database is locked»
+            self.stderr.write('SQLite allows a single writer, using one worker.')
+            workers = 1
+
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        plan = {
+            'seed': options['seed'], 'now': now, 'days': options['days'], 'prefix': options['prefix'],
+            'chunk_size': options['chunk_size'], 'batch_size': options['batch_size'],
+            'users': options['users'], 'tasks': options['tasks'],
+            'subtasks_per_task': options['subtasks_per_task'], 'max_subtasks': options['max_subtasks'],
+            'max_categories': options['max_categories'], **library,
+        }
+        if plan['tasks'] and not plan['users']:
+            raise CommandError('--tasks needs at least one user.')
+
+        created = Counter()
+        with transaction.atomic():
+            created['users'] = self.create_users(plan, rng, options)
+            plan['category_ids'] = self.create_categories(plan, options)
+            created['categories'] = len(plan['category_ids'])
+            if library['books'] or library['members']:
+                created.update(self.create_library_references(plan, rng, options))
+            # Резерв id: каждая пачка вставляет строки со своими id, без общего счётчика
+            plan['task_base'] = next_id(Task)
+            plan['subtask_base'] = next_id(SubTask)
+            if library['books'] or library['members']:
+                plan['book_base'] = next_id(apps.get_model('library', 'Book'))
+                plan['member_base'] = next_id(apps.get_model('library', 'Member'))
+
+        for phase in synthetic.jobs(plan):
+            for counts in self.run_phase(phase, plan, workers):
+                created.update(counts)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{sum(created.values())} rows...')
+
+        self.reset_sequences()
+        if not options['skip_counters']:
+            self.rebuild_counters()
+
+        elapsed = time.perf_counter() - started
+        total = sum(created.values())
+        for table, count in created.items():
+            self.stdout.write(f'{table}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / max(elapsed, 0.001):.0f} rows/s, {workers} worker(s)).'))
+
+    def library_counts(self, options):
+        defaults = {'books': 10000, 'members': 5000, 'borrows': 50000}
+        installed = apps.is_installed('library')
+        if not installed and any(options[name] for name in defaults):
+            raise CommandError('The library app is not installed, --books/--members/--borrows are unavailable.')
+        counts = {name: (options[name] if options[name] is not None else default) if installed else 0
+                  for name, default in defaults.items()}
+        if counts['borrows'] and not (counts['books'] and counts['members']):
+            raise CommandError('--borrows needs books and members.')
+        counts['authors'] = max(counts['books'] // 20, 1)
+        counts['publishers'] = max(counts['books'] // 500, 1)
+        return counts
+
+    def create_users(self, plan, rng, options):
+        User = get_user_model()
+        plan['user_base'] = next_id(User)
+        # Один хэш на всех: хэширование пароля на каждого пользователя заняло бы минуты
+        password = make_password(options['password'])
+        User.objects.bulk_create(
+            [User(pk=pk, username=f'{options["prefix"]}_{pk}', email=f'{options["prefix"]}_{pk}@example.com',
+                  password=password, date_joined=plan['now'] - timedelta(days=options['days']))
+             for pk in range(plan['user_base'], plan['user_base'] + plan['users'])],
+            batch_size=options['batch_size'],
+        )
+        OwnerVersion.objects.bulk_create(
+            [OwnerVersion(owner_id=pk, version=1, updated_at=plan['now'])
+             for pk in range(plan['user_base'], plan['user_base'] + plan['users'])],
+            batch_size=options['batch_size'], ignore_conflicts=True,
+        )
+        # Активность пользователей распределена по Парето: у немногих — большая часть задач
+        plan['owner_weights'] = list(itertools.accumulate(rng.paretovariate(1.5) for _ in range(plan['users'])))
+        return plan['users']
+
+    def create_categories(self, plan, options):
+        names = [f'{options["prefix"]} {index}' for index in range(options['categories'])]
+        return [category.pk for category in Category.objects.upsert_names(names, batch_size=options['batch_size'])]
+
+    def create_library_references(self, plan, rng, options):
+        Author, Publisher, Library, LibraryCategory = (
+            apps.get_model('library', name) for name in ('Author', 'Publisher', 'Library', 'Category'))
+        plan['author_base'], plan['publisher_base'] = next_id(Author), next_id(Publisher)
+        Author.objects.bulk_create(
+            [Author(pk=pk, first_name=rng.choice(synthetic.FIRST_NAMES), last_name=rng.choice(synthetic.LAST_NAMES),
+                    rating=rng.randint(1, 10))
+             for pk in range(plan['author_base'], plan['author_base'] + plan['authors'])],
+            batch_size=options['batch_size'])
+        Publisher.objects.bulk_create(
+            [Publisher(pk=pk, name=f'Publisher {pk}', country=rng.choice(('RU', 'DE', 'US', 'FR')))
+             for pk in range(plan['publisher_base'], plan['publisher_base'] + plan['publishers'])])
+        libraries = Library.objects.bulk_create(
+            [Library(name=f'Library {index}', location=f'{options["prefix"]} street {index}')
+             for index in range(options['libraries'])])
+        plan['library_ids'] = [library.pk for library in libraries]
+        if None in plan['library_ids']:
+            # MySQL не возвращает id из bulk_create
+            plan['library_ids'] = list(Library.objects.order_by('-pk')
+                                       .values_list('pk', flat=True)[:options['libraries']])
+        LibraryCategory.objects.bulk_create([LibraryCategory(name=genre) for genre in synthetic.GENRES],
+                                            ignore_conflicts=True)
+        plan['library_category_ids'] = list(LibraryCategory.objects.filter(name__in=synthetic.GENRES)
+                                            .values_list('pk', flat=True))
+        return {'authors': plan['authors'], 'publishers': plan['publishers'], 'libraries': len(libraries)}
+
+    def run_phase(self, phase, plan, workers):
+        if workers == 1:
+            # В этом же процессе и соединении (в том числе в тестовой базе)
+            synthetic._plan = plan
+            yield from map(synthetic.run_job, phase)
+            return
+        # Дочерние процессы не должны унаследовать открытое соединение
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=synthetic.init_worker, initargs=(plan,)) as pool:
+            yield from pool.map(synthetic.run_job, phase)
+
+    def reset_sequences(self):
+        # PostgreSQL: последовательности не знают о явно вставленных id
+        models = [get_user_model(), Task, SubTask]
+        if apps.is_installed('library'):
+            models += [apps.get_model('library', name) for name in ('Author', 'Publisher', 'Book', 'Member')]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def rebuild_counters(self):
+        # bulk_create не вызывает сигналы: счётчики пересчитываются целиком
+        for command in ('rebuild_task_stats', 'reconcile_category_counts'):
+            output = io.StringIO()
+            call_command(command, stdout=output)
+            self.stdout.write(output.getvalue().splitlines()[-1])
+
+
+def next_id(model):
+    manager = getattr(model, 'all_objects', model._default_manager)
+    return (manager.aggregate(last=Max('pk'))['last'] or 0) + 1
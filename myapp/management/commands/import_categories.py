@@ -0,0 +1,38 @@
+# myapp/management/commands/import_categories.py
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from myapp.models import Category
+
+
+class Command(BaseCommand):
+    help = ('Импортирует категории из файла (по одному имени в строке, "-" — stdin). '
+            'Существующие пропускаются, мягко удалённые восстанавливаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с именами категорий или "-" для stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            names = self.read_names(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as source:
+                names = self.read_names(source)
+
+        max_length = Category._meta.get_field('name').max_length
+        too_long = [name for name in names if len(name) > max_length]
+        for name in too_long:
+            self.stderr.write(f'Skipped (longer than {max_length}): {name}')
+        names = [name for name in names if len(name) <= max_length]
+
+        batch_size = options['batch_size']
+        imported = 0
+        for start in range(0, len(names), batch_size):
+            imported += len(Category.objects.upsert_names(names[start:start + batch_size], batch_size=batch_size))
+        self.stdout.write(self.style.SUCCESS(f'Upserted {imported} categor{"y" if imported == 1 else "ies"}.'))
+
+    def read_names(self, lines):
+        return list(dict.fromkeys(line.strip() for line in lines if line.strip()))
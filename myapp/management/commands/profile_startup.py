@@ -0,0 +1,36 @@
+# myapp/management/commands/profile_startup.py
+
+from django.core.management.base import BaseCommand
+
+from myapp import startup
+
+
+class Command(BaseCommand):
+    help = ('Замеряет холодный старт воркера в отдельном процессе: django.setup(), import_models() '
+            'и ready() каждого приложения, время импорта модулей (-X importtime) и, с --urls, '
+            'загрузку ROOT_URLCONF. Показывает самые дорогие пункты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Сколько строк в каждом списке.')
+        parser.add_argument('--urls', action='store_true', help='Также импортировать ROOT_URLCONF.')
+
+    def handle(self, *args, **options):
+        top = options['top']
+        timings = startup.probe(urls=options['urls'])
+
+        self.stdout.write(f'django.setup(): {timings["setup"] * 1000:.1f} ms')
+        if 'urlconf' in timings:
+            self.stdout.write(f'ROOT_URLCONF:   {timings["urlconf"] * 1000:.1f} ms')
+
+        for kind, title in (('models', 'import_models()'), ('ready', 'ready()')):
+            self.stdout.write(f'\n{title} by app, ms:')
+            for label, seconds in sorted(timings[kind].items(), key=lambda item: item[1], reverse=True)[:top]:
+                self.stdout.write(f'  {seconds * 1000:8.1f}  {label}')
+
+        imports = timings['imports']
+        self.stdout.write('\nPackages (own import time), ms:')
+        for package, own in startup.package_totals(imports)[:top]:
+            self.stdout.write(f'  {own / 1000:8.1f}  {package}')
+        self.stdout.write('\nModules (cumulative import time), ms:')
+        for module, _, cumulative, _ in sorted(imports, key=lambda row: row[2], reverse=True)[:top]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f}  {module}')
@@ -0,0 +1,56 @@
+# myapp/management/commands/purge_deleted_categories.py
+
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from myapp.models import Category
+
+
+class Command(BaseCommand):
+    help = ('Окончательно удаляет категории, мягко удалённые больше N дней назад. '
+            'Удаляет пачками в коротких транзакциях, чтобы не держать долгих блокировок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Возраст удаления в днях (по умолчанию 30).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.0, help='Пауза между пачками, с.')
+        parser.add_argument('--archive', help='Перед удалением дописать строки в этот файл (NDJSON).')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не удаляя.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Category.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} categor(ies) would be purged.')
+            return
+
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        purged = 0
+        try:
+            while True:
+                with transaction.atomic():
+                    # Пачка по частичному индексу (deleted_at, id) WHERE is_deleted
+                    rows = list(expired.order_by('deleted_at', 'id')
+                                .values('id', 'name', 'deleted_at', 'task_count')[:options['batch_size']])
+                    if not rows:
+                        break
+                    Category.all_objects.filter(pk__in=[row['id'] for row in rows]).delete()
+                    if archive is not None:
+                        for row in rows:
+                            archive.write(json.dumps({**row, 'deleted_at': row['deleted_at'].isoformat()},
+                                                     ensure_ascii=False) + '\n')
+                        archive.flush()
+                purged += len(rows)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Purged {purged}...')
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if archive is not None:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} categor(ies) deleted before {cutoff:%Y-%m-%d}.'))
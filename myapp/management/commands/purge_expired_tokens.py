@@ -0,0 +1,37 @@
+# myapp/management/commands/purge_expired_tokens.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from myapp.blacklist import outstanding_tokens
+
+
+class Command(BaseCommand):
+    help = ('Удаляет истёкшие OutstandingToken (и их BlacklistedToken каскадом) пачками в коротких '
+            'транзакциях. Запускать по расписанию (cron), например раз в час.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help='Пауза между пачками, с.')
+
+    def handle(self, *args, **options):
+        outstanding_tokens.flush()
+        now = timezone.now()
+        expired = OutstandingToken.objects.filter(expires_at__lt=now)
+        purged = 0
+        while True:
+            with transaction.atomic():
+                ids = list(expired.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                OutstandingToken.objects.filter(pk__in=ids).delete()
+            purged += len(ids)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Purged {purged}...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired token(s).'))
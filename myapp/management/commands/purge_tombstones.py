@@ -0,0 +1,38 @@
+# myapp/management/commands/purge_tombstones.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from myapp.models import OwnerVersion, Tombstone
+
+
+class Command(BaseCommand):
+    help = ('Удаляет старые надгробия ленты изменений. Клиенты с токеном старше удалённых '
+            'надгробий получат 410 и сделают полную синхронизацию.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Сколько дней хранить надгробия (по умолчанию 30).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Tombstone.objects.filter(deleted_at__lt=cutoff)
+        # Сначала порог (до удаления первого надгробия), затем удаление — каждая пачка в своей транзакции
+        with transaction.atomic():
+            floors = expired.values('owner_id').annotate(version=Max('version')).order_by()
+            for row in floors:
+                # Порог только растёт
+                OwnerVersion.objects.filter(owner_id=row['owner_id'], tombstone_floor__lt=row['version']) \
+                    .update(tombstone_floor=row['version'])
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(expired.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                deleted += Tombstone.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstone(s) older than {cutoff:%Y-%m-%d}.'))
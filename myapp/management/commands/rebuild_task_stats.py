@@ -0,0 +1,62 @@
+# myapp/management/commands/rebuild_task_stats.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from myapp.models import TaskStats
+from myapp.stats import COUNTER_FIELDS, compute_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу TaskStats с нуля и сообщает о расхождениях со старыми значениями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только проверить расхождения, ничего не записывая (код выхода 1 при дрейфе).')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        fresh = compute_counters(now)
+        stored = {stats.scope: stats for stats in TaskStats.objects.all()}
+
+        drifted = []
+        for scope, counters in fresh.items():
+            current = stored.get(scope)
+            if current is None:
+                if any(counters[field] for field in COUNTER_FIELDS):
+                    drifted.append((scope, 'missing'))
+                continue
+            diff = {field: (getattr(current, field), counters[field])
+                    for field in COUNTER_FIELDS if getattr(current, field) != counters[field]}
+            if diff and not (set(diff) == {'overdue'} and current.overdue_valid_until
+                             and current.overdue_valid_until <= now):
+                # устаревший overdue с истёкшим overdue_valid_until — не дрейф, он пересчитается при чтении
+                drifted.append((scope, ', '.join(f'{f}: {old} -> {new}' for f, (old, new) in diff.items())))
+        stale = set(stored) - set(fresh)
+        for scope in stale:
+            if any(getattr(stored[scope], field) for field in COUNTER_FIELDS):
+                drifted.append((scope, 'counters left for an owner without tasks'))
+
+        for scope, detail in sorted(drifted, key=lambda item: item[0]):
+            label = 'global' if scope == TaskStats.GLOBAL_SCOPE else f'user {scope}'
+            self.stdout.write(f'{label}: {detail}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'Drift found in {len(drifted)} scope(s).')
+            self.stdout.write(self.style.SUCCESS('No drift.'))
+            return
+
+        # MySQL (ON DUPLICATE KEY UPDATE) не принимает unique_fields — конфликт там по любому уникальному ключу
+        unique_fields = ['scope'] if connection.features.supports_update_conflicts_with_target else None
+        TaskStats.objects.bulk_create(
+            [TaskStats(scope=scope, **counters) for scope, counters in fresh.items()],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=[*COUNTER_FIELDS, 'overdue_valid_until'],
+            batch_size=1000,
+        )
+        TaskStats.objects.filter(scope__in=stale).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(fresh)} scope(s), {len(drifted)} had drift.'))
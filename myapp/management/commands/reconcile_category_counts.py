@@ -0,0 +1,33 @@
+# myapp/management/commands/reconcile_category_counts.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from myapp.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Category.task_count с таблицей связей и исправляет расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Только проверить расхождения, ничего не записывая (код выхода 1 при дрейфе).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        drifted = []
+        rows = (Category.all_objects.order_by('pk')
+                .annotate(actual=Count('task')).values_list('pk', 'name', 'task_count', 'actual'))
+        for pk, name, stored, actual in rows.iterator(chunk_size=options['batch_size']):
+            if stored != actual:
+                drifted.append(Category(pk=pk, task_count=actual))
+                self.stdout.write(f'{name}: {stored} -> {actual}')
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'Drift found in {len(drifted)} categor{"y" if len(drifted) == 1 else "ies"}.')
+            self.stdout.write(self.style.SUCCESS('No drift.'))
+            return
+
+        Category.all_objects.bulk_update(drifted, ['task_count'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(drifted)} categor{"y" if len(drifted) == 1 else "ies"}.'))
@@ -0,0 +1,252 @@
+# myapp/metrics.py
+
+import atexit
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+# Границы корзин гистограммы задержки, секунды (+Inf добавляется при выводе)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """
+    Счётчики и гистограммы с фиксированными корзинами в памяти процесса.
+    Ключ — (имя метрики, метки); метки — кортеж пар (имя, значение).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self.help = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = {
+                    'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            for index, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'help': dict(self.help),
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), {**histogram, 'counts': list(histogram['counts'])}]
+                               for (name, labels), histogram in self._histograms.items()],
+            }
+
+
+class FileStore:
+    """
+    Снимки реестров процессов в METRICS_DIR: каждый процесс пишет свой файл
+    (атомарная замена), /metrics суммирует все. Файлы завершившихся процессов
+    удаляются при чтении — после перезапуска воркера счётчики сбрасываются,
+    Prometheus учитывает это в rate()/increase().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # pid может повториться после перезапуска — добавляем время старта
+        self.path = os.path.join(directory, f'{os.getpid()}-{time.time_ns()}.json')
+
+    def write(self, snapshot):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(tmp, self.path)
+
+    def read_all(self):
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if not _alive(path):
+                _remove(path)
+                continue
+            try:
+                with open(path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue  # файл другого процесса могли удалить при очистке
+        return snapshots
+
+
+def _alive(path):
+    """Жив ли процесс, записавший файл <pid>-<время старта>.json."""
+    try:
+        pid = int(os.path.basename(path).split('-', 1)[0])
+    except ValueError:
+        return True  # чужой файл не трогаем
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # процесс есть, но другого пользователя
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # файл уже удалил другой процесс
+
+
+def merge(snapshots):
+    help_texts = {}
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        help_texts.update(snapshot['help'])
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = {**histogram, 'counts': list(histogram['counts'])}
+                continue
+            total['counts'] = [a + b for a, b in zip(total['counts'], histogram['counts'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return help_texts, counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(snapshots):
+    """Текстовый формат Prometheus (version 0.0.4)."""
+    help_texts, counters, histograms = merge(snapshots)
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        if name in help_texts:
+            lines.append(f'# HELP {name} {help_texts[name]}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    for name in sorted({name for name, _ in histograms}):
+        if name in help_texts:
+            lines.append(f'# HELP {name} {help_texts[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+            lines.append(f'{name}_sum{_labels(labels)} {repr(histogram["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe('http_requests_total', 'HTTP requests by route and status class.')
+registry.describe('http_request_duration_seconds', 'HTTP request latency by route and status class.')
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """FileStore этого процесса (если задан METRICS_DIR) с фоновой записью снимка раз в METRICS_FLUSH_INTERVAL."""
+    global _store, _store_pid
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if not directory:
+        return None
+    if _store_pid == os.getpid():
+        return _store
+    with _store_lock:
+        if _store_pid != os.getpid():
+            # Первый вызов или новый процесс после fork: свой файл и свой поток записи
+            _store = FileStore(directory)
+            _store_pid = os.getpid()
+            interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+            threading.Thread(target=_flush_loop, args=(_store, interval), name='metrics-flush', daemon=True).start()
+            atexit.register(flush)
+    return _store
+
+
+def _flush_loop(store, interval):
+    while True:
+        time.sleep(interval)
+        store.write(registry.snapshot())
+
+
+def flush():
+    store = get_store()
+    if store is not None:
+        store.write(registry.snapshot())
+
+
+def observe_request(route, status_code, duration_seconds):
+    labels = (('route', route or 'unmatched'), ('status', f'{status_code // 100}xx'))
+    registry.inc('http_requests_total', labels)
+    registry.observe('http_request_duration_seconds', labels, duration_seconds)
+    get_store()
+
+
+def collect():
+    """Текст /metrics: все процессы из METRICS_DIR или только этот процесс."""
+    store = get_store()
+    if store is None:
+        return render([registry.snapshot()])
+    store.write(registry.snapshot())
+    return render(store.read_all())
+
+
+def metrics_view(request):
+    """
+    GET /metrics — текстовый формат Prometheus. Нужен Authorization: Bearer <METRICS_TOKEN>;
+    без токена в настройках закрыт, если не задан METRICS_PUBLIC.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not getattr(settings, 'METRICS_PUBLIC', False):
+            return HttpResponse(status=403)
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(collect(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,25 +1,207 @@
 # myapp/middleware.py
 
 import logging
+import random
 import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+from myapp import metrics
+from myapp.querycount import QueryCounter
 
 logger = logging.getLogger('http_logger')
+db_logger = logging.getLogger('myapp.db')
+
+# Текущий HTTP-запрос — для логов, которые пишутся не из view (myapp/slowqueries.py)
+current_request = ContextVar('current_request', default=None)
+
+
+def get_user_id(request):
+    """id пользователя, если он уже определён (DRF/сессия); ленивого пользователя не вычисляем — это запрос к БД."""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        if user._wrapped is empty:
+            return None
+        user = user._wrapped
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else None
+
 
 class LogRequestMiddleware:
+    """
+    Строка лога на каждый запрос: метод, путь, статус, маршрут, пользователь, размер, время.
+    Работает и в синхронной, и в асинхронной цепочке (ASGI) без перехода в поток;
+    запись в файл — в фоне (myapp.log_handlers.BackgroundFileHandler).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter_ns()
+        token = current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.log(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter_ns()
+        token = current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.log(request, response, start)
+        return response
+
+    def log(self, request, response, start):
+        duration_ms = (time.perf_counter_ns() - start) / 1e6
+        fields = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'route': get_route(request),
+            'user_id': get_user_id(request),
+            'bytes': None if response.streaming else len(response.content),
+            'duration_ms': round(duration_ms, 2),
+            'remote_addr': request.META.get('REMOTE_ADDR'),
+        }
+        message = '%s %s status=%s route=%s user=%s bytes=%s duration_ms=%.2f ip=%s'
+        args = [
+            fields['method'], fields['path'], fields['status'], fields['route'] or '-',
+            fields['user_id'] or '-', '-' if fields['bytes'] is None else fields['bytes'],
+            duration_ms, fields['remote_addr'],
+        ]
+        counter = getattr(request, 'db_counter', None)
+        if counter is not None:
+            # Запрос попал в выборку DBTimingMiddleware
+            fields['db_queries'] = counter.count
+            fields['db_ms'] = round(counter.duration * 1000, 2)
+            message += ' db_queries=%s db_ms=%.2f'
+            args += [counter.count, counter.duration * 1000]
+        # Поля и в тексте (key=value), и в extra — для структурных форматтеров
+        logger.info(message, *args, extra=fields)
+
+
+class MetricsMiddleware:
+    """
+    Число запросов и гистограмма задержки по маршруту и классу статуса (myapp/metrics.py).
+    Стоит первым в MIDDLEWARE, чтобы учитывать время всей цепочки.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        start_time = time.time()
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter_ns()
         response = self.get_response(request)
-        duration = time.time() - start_time
-
-        logger.info(
-            '%s %s %s %s %.2f sec',
-            request.method,
-            request.get_full_path(),
-            response.status_code,
-            request.META.get('REMOTE_ADDR'),
-            duration
-        )
+        metrics.observe_request(get_route(request), response.status_code, (time.perf_counter_ns() - start) / 1e9)
         return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter_ns()
+        response = await self.get_response(request)
+        metrics.observe_request(get_route(request), response.status_code, (time.perf_counter_ns() - start) / 1e9)
+        return response
+
+
+class DBTimingMiddleware:
+    """
+    Число SQL-запросов, время в БД и самый медленный запрос на каждый запрос из выборки
+    (DB_TIMING_SAMPLE_RATE): заголовок Server-Timing, поля db_queries/db_ms в логе
+    LogRequestMiddleware, предупреждение в лог myapp.db при превышении порогов
+    DB_TIMING_SLOW_MS / DB_TIMING_MAX_QUERIES.
+
+    execute_wrapper действует на соединение текущего потока. В асинхронной цепочке
+    синхронный view выполняется в потоке запроса (sync_to_async thread_sensitive) —
+    счётчик ставится на соединение этого потока одним переходом в него до view
+    (только для запросов из выборки) и снимается после: поток к тому времени свободен.
+    Стоит последним в MIDDLEWARE: запросы к БД из middleware выше (сессия, пользователь)
+    не учитываются.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'DB_TIMING_SAMPLE_RATE', 1.0)
+        self.slow_ms = getattr(settings, 'DB_TIMING_SLOW_MS', None)
+        self.max_queries = getattr(settings, 'DB_TIMING_MAX_QUERIES', None)
+        self.header = getattr(settings, 'DB_TIMING_HEADER', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        counter = request.db_counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        self.report(request, response, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        counter = request.db_counter = QueryCounter()
+        wrapped = await sync_to_async(install_wrapper)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrapped.execute_wrappers.remove(counter)
+        self.report(request, response, counter)
+        return response
+
+    def report(self, request, response, counter):
+        db_ms = counter.duration * 1000
+        if self.header:
+            timing = f'db;dur={db_ms:.2f};desc="{counter.count} queries"'
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        if (self.slow_ms is not None and db_ms > self.slow_ms) or \
+                (self.max_queries is not None and counter.count > self.max_queries):
+            db_logger.warning(
+                '%s %s: %s queries, db_ms=%.2f, slowest %.2f ms: %s',
+                request.method, request.path, counter.count, db_ms,
+                counter.slowest * 1000, (counter.slowest_sql or '')[:500],
+            )
+
+
+def install_wrapper(wrapper):
+    """Ставит wrapper на соединение текущего потока и возвращает это соединение."""
+    wrapped = connections[DEFAULT_DB_ALIAS]
+    wrapped.execute_wrappers.append(wrapper)
+    return wrapped
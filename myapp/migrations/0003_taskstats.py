@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_subtask_owner_task_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStats',
+            fields=[
+                ('scope', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0)),
+                ('status_new', models.IntegerField(default=0)),
+                ('status_in_progress', models.IntegerField(default=0)),
+                ('status_pending', models.IntegerField(default=0)),
+                ('status_blocked', models.IntegerField(default=0)),
+                ('status_done', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('overdue_valid_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:05
+
+from django.db import migrations
+
+from myapp import search
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_task_subtask_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(search.install_search_index, search.uninstall_search_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:04
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_task_count(apps, schema_editor):
+    Category = apps.get_model('myapp', 'Category')
+    Link = apps.get_model('myapp', 'Task').categories.through
+    links = (Link.objects.filter(category_id=models.OuterRef('pk')).order_by()
+             .values('category_id').annotate(count=models.Count('pk')).values('count'))
+    Category.objects.update(task_count=Coalesce(models.Subquery(links), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-task_count', 'name'], name='category_popularity_idx'),
+        ),
+        migrations.RunPython(fill_task_count, migrations.RunPython.noop),
+    ]
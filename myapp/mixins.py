@@ -0,0 +1,163 @@
+# myapp/mixins.py
+
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from myapp import versions
+from myapp.permissions import owner_filter
+from myapp.querycount import QueryCounter
+from myapp.serializers import requested_fields
+
+logger = logging.getLogger('myapp.query_budget')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def ordering_columns(view, queryset):
+    """
+    Столбцы модели, по которым view сортирует и строит курсор пагинации:
+    их нельзя отложить через only(), иначе каждая строка догрузит их отдельным запросом.
+    """
+    ordering = [*queryset.query.order_by, *(getattr(view, 'ordering', None) or ())]
+    if view.paginator is not None:
+        ordering.extend(getattr(view.paginator, 'ordering', None) or ())
+    columns = []
+    for field in ordering:
+        name = field.lstrip('-') if isinstance(field, str) else None
+        if name == 'pk':
+            name = queryset.model._meta.pk.name
+        try:
+            concrete = name is not None and queryset.model._meta.get_field(name).concrete
+        except FieldDoesNotExist:
+            concrete = False
+        if concrete and name not in columns:
+            columns.append(name)
+    return columns
+
+
+class EagerLoadingViewMixin:
+    """
+    Применяет к queryset связи, объявленные сериализатором
+    (select_related_fields / prefetch_related_fields в myapp.serializers.EagerLoadingMixin).
+    При ?fields= / ?omit= — только нужные связи и столбцы (only()).
+    Работает в filter_queryset, поэтому не мешает view переопределять get_queryset.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            fields = requested_fields(self.request, serializer_class.Meta.fields)
+            keep = ordering_columns(self, queryset) if fields is not None else ()
+            queryset = serializer_class.setup_eager_loading(queryset, fields, keep)
+        return queryset
+
+
+class OwnerScopedMixin:
+    """
+    Ограничивает queryset условиями OwnerPermission из permission_classes
+    (myapp/permissions.py): get_object() находит объект и проверяет владельца одним запросом.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset  # генерация схемы drf_yasg: запроса нет
+        condition = owner_filter(self.request, self, self.get_permissions())
+        return queryset if condition is None else queryset.filter(condition)
+
+
+class ValuesListMixin:
+    """
+    Списки через values_serializer_class (myapp.serializers.ValuesListSerializer),
+    если включён FAST_LIST_SERIALIZATION. Фильтры, сортировка и пагинация — те же.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None or not getattr(settings, 'FAST_LIST_SERIALIZATION', False):
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.values_serializer_class(context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = serializer.get_rows(queryset, keep=ordering_columns(self, queryset))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(list(rows)))
+
+
+class QueryBudgetMixin:
+    """
+    Ограничение числа SQL-запросов на запрос к view.
+    query_budget — для безопасных методов (GET, HEAD, OPTIONS), write_query_budget — для остальных.
+    При превышении пишет предупреждение в лог или, если QUERY_BUDGET_MODE = 'raise', падает.
+    """
+    query_budget = None
+    write_query_budget = None
+
+    def get_query_budget(self, request):
+        if request.method in permissions.SAFE_METHODS:
+            return self.query_budget
+        return self.write_query_budget
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget(request)
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > budget:
+            message = '%s %s: %s queries, budget %s (%s)' % (
+                request.method, request.path, counter.count, budget, type(self).__name__)
+            if getattr(settings, 'QUERY_BUDGET_MODE', 'log') == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified по версии владельца (myapp/versions.py).
+    Условный GET (If-None-Match / If-Modified-Since) с совпавшей версией получает 304
+    после одного чтения OwnerVersion — без запросов к таблицам задач.
+    """
+
+    def get_owner_version(self, request, *args, **kwargs):
+        """(owner_id, (version, updated_at)) — по умолчанию данные текущего пользователя."""
+        return request.user.id, versions.get_version(request.user.id)
+
+    def get(self, request, *args, **kwargs):
+        owner_id, (version, updated_at) = self.get_owner_version(request, *args, **kwargs)
+        if owner_id is None:
+            return super().get(request, *args, **kwargs)
+
+        # Разные фильтры, курсоры и форматы одного владельца — разные ETag
+        variant = hashlib.md5(
+            f'{request.get_full_path()}|{request.META.get("HTTP_ACCEPT", "")}'.encode()
+        ).hexdigest()[:12]
+        etag = f'W/"{owner_id}-{version}-{variant}"'
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -1,10 +1,78 @@
 # DjangoProject/myapp/models.py
 
-from django.db import models
+from collections import defaultdict
+
+from django.db import connections, models, transaction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-class CategoryManager(models.Manager):
+class CategoryQuerySet(models.QuerySet):
+    def upsert_names(self, names, batch_size=1000):
+        """
+        Создаёт категории по именам без проверки exists() перед вставкой: на пачку один
+        INSERT ... ON CONFLICT (name) DO NOTHING RETURNING (SQLite, PostgreSQL) / INSERT IGNORE (MySQL).
+        Новые строки приходят из самой вставки (на MySQL — id не меньше LAST_INSERT_ID() пачки),
+        уже существовавшие имена читаются одним запросом, мягко удалённые восстанавливаются.
+        Возвращает категории в порядке имён (без повторов) с id и task_count из базы;
+        created — новая ли категория.
+        """
+        from myapp import versions
+
+        names = list(dict.fromkeys(names))
+        rows = {}  # name -> (id, task_count, is_deleted, created)
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(names), batch_size):
+                batch = names[start:start + batch_size]
+                inserted, first_id = self._insert_names(batch)
+                rows.update((name, (pk, 0, False, True)) for pk, name in inserted)
+                existing = [name for name in batch if name not in rows]
+                if existing:
+                    for pk, name, task_count, is_deleted in (Category.all_objects.using(self.db)
+                                                             .filter(name__in=existing)
+                                                             .values_list('pk', 'name', 'task_count', 'is_deleted')):
+                        rows[name] = (pk, task_count, is_deleted, first_id is not None and pk >= first_id)
+            revived = [pk for pk, _, is_deleted, _ in rows.values() if is_deleted]
+            if revived:
+                Category.all_objects.using(self.db).filter(pk__in=revived).update(is_deleted=False, deleted_at=None)
+                # Восстановленная категория снова видна в связанных задачах
+                versions.touch_tasks(Task.categories.through.objects.filter(category_id__in=revived)
+                                     .values_list('task_id', flat=True))
+
+        categories = []
+        for name in names:
+            pk, task_count, _, created = rows[name]
+            category = Category(pk=pk, name=name, is_deleted=False, deleted_at=None, task_count=task_count)
+            category._state.adding, category._state.db = False, self.db
+            category.created = created
+            categories.append(category)
+        return categories
+
+    def _insert_names(self, names):
+        """
+        Вставляет отсутствующие имена, конфликты по name пропускаются.
+        ([(id, name) вставленных], None) или, на MySQL без RETURNING, ([], первый выданный id или None).
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        opts = Category._meta
+        columns = ', '.join(quote(opts.get_field(field).column) for field in ('name', 'is_deleted', 'task_count'))
+        values = ', '.join(['(%s, %s, %s)'] * len(names))
+        params = [value for name in names for value in (name, False, 0)]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # ON DUPLICATE KEY UPDATE не говорит, какие строки новые; id вставленных пачкой строк
+                # идут подряд от LAST_INSERT_ID()
+                cursor.execute(f'INSERT IGNORE INTO {quote(opts.db_table)} ({columns}) VALUES {values}', params)
+                return [], (cursor.lastrowid if cursor.rowcount > 0 else None)
+            cursor.execute(
+                f'INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {values} '
+                f'ON CONFLICT ({quote(opts.get_field("name").column)}) DO NOTHING '
+                f'RETURNING {quote(opts.pk.column)}, {quote(opts.get_field("name").column)}',
+                params,
+            )
+            return cursor.fetchall(), None
+
+class CategoryManager(models.Manager.from_queryset(CategoryQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
 
@@ -12,21 +80,142 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
+    # Число связанных задач; поддерживается сигналами (myapp/categories.py), сверка — reconcile_category_counts
+    task_count = models.PositiveIntegerField(default=0)
 
     objects = CategoryManager()  # Кастомный менеджер
-    all_objects = models.Manager()  # Стандартный менеджер для доступа ко всем записям
+    all_objects = CategoryQuerySet.as_manager()  # Стандартный менеджер для доступа ко всем записям
+
+    class Meta:
+        indexes = [
+            # Сортировка по популярности в CategoryViewSet
+            models.Index(fields=['-task_count', 'name'], name='category_popularity_idx'),
+            # Частичные индексы (SQLite, PostgreSQL; MySQL их не поддерживает и пропускает):
+            # активные категории по имени — без удалённых строк в скане
+            models.Index(fields=['name'], condition=models.Q(is_deleted=False), name='category_active_name_idx'),
+            # корзина и purge_deleted_categories
+            models.Index(fields=['deleted_at', 'id'], condition=models.Q(is_deleted=True),
+                         name='category_deleted_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # task_count меняют только UPDATE со сдвигом (myapp/categories.py) — не затираем его значением из памяти
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'task_count']
+        super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.save()
+        self.save(update_fields=['is_deleted', 'deleted_at'])
 
     def __str__(self):
         return self.name
 
 User = get_user_model()
 
-class Task(models.Model):
+class SyncQuerySet(models.QuerySet):
+    def delete(self):
+        # Надгробия удалённых строк пишутся одним bulk_create, версия владельца выдаётся один раз
+        from myapp import versions
+
+        with transaction.atomic(), versions.batch():
+            return super().delete()
+
+    def update_stamped(self, ids_by_owner, **values):
+        """
+        update() строк по id со штампом updated_at/sync_version (обычный update() его не ставит):
+        одна новая версия на владельца. Вызывать в транзакции.
+        """
+        from myapp import versions
+
+        now = timezone.now()
+        updated = 0
+        for owner_id, ids in ids_by_owner.items():
+            version = versions.allocate(owner_id)
+            for start in range(0, len(ids), 500):
+                updated += self.model.objects.filter(pk__in=ids[start:start + 500]).update(
+                    updated_at=now, sync_version=version, **values)
+        return updated
+
+class SyncTrackedModel(models.Model):
+    """
+    Строка для дельта-синхронизации (myapp/sync.py): updated_at и sync_version —
+    версия данных владельца (OwnerVersion) на момент записи.
+    Удаление оставляет Tombstone с такой же версией.
+    """
+    SYNC_FIELDS = ('updated_at', 'sync_version')
+
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from myapp import versions
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if not update_fields:
+                return super().save(*args, **kwargs)
+            kwargs['update_fields'] = {*update_fields, *self.SYNC_FIELDS}
+        # Версия выдаётся в той же транзакции, что и запись строки (см. versions.allocate)
+        with transaction.atomic():
+            self.sync_version = versions.allocate(self.owner_id)
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from myapp import versions
+
+        with transaction.atomic(), versions.batch():
+            return super().delete(*args, **kwargs)
+
+class TaskQuerySet(SyncQuerySet):
+    def delete(self):
+        # Связи с категориями снимаются со счётчиков одним запросом на весь queryset
+        from myapp import categories
+
+        with transaction.atomic(), categories.releasing_tasks(self):
+            return super().delete()
+
+    def update_status(self, status):
+        """
+        Массовая смена статуса с пересчётом TaskStats и штампом sync_version
+        (обычный update() сигналы не вызывает).
+        """
+        from myapp import stats
+
+        with transaction.atomic():
+            rows = list(self.exclude(status=status).select_for_update()
+                        .values_list('pk', 'owner_id', 'status', 'deadline'))
+            by_owner = defaultdict(list)
+            for pk, owner_id, _, _ in rows:
+                by_owner[owner_id].append(pk)
+            updated = self.update_stamped(by_owner, status=status)
+            stats.record_changes(
+                [(owner_id, old_status, deadline) for _, owner_id, old_status, deadline in rows],
+                [(owner_id, status, deadline) for _, owner_id, _, deadline in rows],
+            )
+        return updated
+
+class SubTaskQuerySet(SyncQuerySet):
+    def update_status(self, status):
+        """Массовая смена статуса подзадач со штампом sync_version и версиями владельцев задач."""
+        from myapp import versions
+
+        with transaction.atomic(), versions.batch():
+            rows = list(self.exclude(status=status).select_for_update().values_list('pk', 'owner_id', 'task_id'))
+            by_owner = defaultdict(list)
+            for pk, owner_id, _ in rows:
+                by_owner[owner_id].append(pk)
+            updated = self.update_stamped(by_owner, status=status)
+            # Подзадачи видны в карточке задачи — как в сигнале bump_version_on_subtask_change
+            versions.bump_for_tasks({task_id for _, _, task_id in rows})
+        return updated
+
+class Task(SyncTrackedModel):
     STATUS_CHOICES = [
         ('New', 'New'),
         ('In progress', 'In progress'),
@@ -34,6 +223,7 @@ class Task(models.Model):
         ('Blocked', 'Blocked'),
         ('Done', 'Done'),
     ]
+    OPEN_STATUSES = ['New', 'In progress', 'Pending', 'Blocked']  # Не завершённые — могут быть просрочены
 
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -44,10 +234,23 @@ class Task(models.Model):
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Страницы MyCursorPagination по задачам владельца: (owner, created_at, id)
+            models.Index(fields=['owner', '-created_at', '-id'], name='task_owner_created_idx'),
+            # Фильтры filterset_fields в пределах владельца
+            models.Index(fields=['owner', 'status', '-created_at', '-id'], name='task_owner_status_idx'),
+            models.Index(fields=['owner', 'deadline'], name='task_owner_deadline_idx'),
+            # Лента изменений: sync_version > X в пределах владельца
+            models.Index(fields=['owner', 'sync_version', 'id'], name='task_owner_sync_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
-class SubTask(models.Model):
+class SubTask(SyncTrackedModel):
     STATUS_CHOICES = [
         ('New', 'New'),
         ('In progress', 'In progress'),
@@ -65,5 +268,100 @@ class SubTask(models.Model):
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subtasks')
 
+    objects = SubTaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='subtask_owner_created_idx'),
+            models.Index(fields=['owner', 'status', '-created_at', '-id'], name='subtask_owner_status_idx'),
+            models.Index(fields=['owner', 'deadline'], name='subtask_owner_deadline_idx'),
+            models.Index(fields=['owner', 'sync_version', 'id'], name='subtask_owner_sync_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class TaskStats(models.Model):
+    """
+    Счётчики задач для TaskStatsView.
+    scope = 0 — глобальная строка, иначе scope = id владельца.
+    Обновляются сигналами Task (myapp/signals.py) и TaskQuerySet.update_status.
+
+    overdue зависит от времени, поэтому хранится вместе с overdue_valid_until —
+    ближайшим будущим дедлайном открытой задачи. До этого момента счётчик точен,
+    после — пересчитывается при чтении (см. myapp/stats.py).
+    """
+    GLOBAL_SCOPE = 0
+    STATUS_FIELDS = {
+        'New': 'status_new',
+        'In progress': 'status_in_progress',
+        'Pending': 'status_pending',
+        'Blocked': 'status_blocked',
+        'Done': 'status_done',
+    }
+
+    scope = models.PositiveBigIntegerField(primary_key=True)
+    total = models.IntegerField(default=0)
+    status_new = models.IntegerField(default=0)
+    status_in_progress = models.IntegerField(default=0)
+    status_pending = models.IntegerField(default=0)
+    status_blocked = models.IntegerField(default=0)
+    status_done = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    overdue_valid_until = models.DateTimeField(null=True, blank=True)
+
+    def as_dict(self):
+        # Тот же формат, что раньше отдавал TaskStatsView (статусы без задач не выводятся)
+        status_counts = {}
+        for status, field in self.STATUS_FIELDS.items():
+            count = getattr(self, field)
+            if count:
+                status_counts[status] = count
+        return {
+            "total_tasks": self.total,
+            "status_counts": status_counts,
+            "overdue_tasks": self.overdue,
+        }
+
+    def __str__(self):
+        return 'global' if self.scope == self.GLOBAL_SCOPE else f'user {self.scope}'
+
+
+class OwnerVersion(models.Model):
+    """
+    Версия данных владельца: растёт при любом изменении его задач, подзадач
+    и их связей с категориями (myapp/versions.py). Из неё строятся ETag и
+    Last-Modified, так что условный GET не трогает таблицы задач.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    # Надгробия с версией <= tombstone_floor могли быть удалены (purge_tombstones):
+    # токен синхронизации старше этой версии больше не годится
+    tombstone_floor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.owner_id}: v{self.version}'
+
+
+class Tombstone(models.Model):
+    """Удалённая задача или подзадача — для ленты изменений (myapp/sync.py)."""
+    KIND_TASK = 'task'
+    KIND_SUBTASK = 'subtask'
+    KIND_CHOICES = [(KIND_TASK, 'Task'), (KIND_SUBTASK, 'SubTask')]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'version', 'id'], name='tombstone_owner_version_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} (v{self.version})'
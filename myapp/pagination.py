@@ -1,7 +1,159 @@
 # myapp/pagination.py
 
-from rest_framework.pagination import CursorPagination
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
 
 class MyCursorPagination(CursorPagination):
+    """
+    Курсор по ключу (keyset): к сортировке всегда добавляется уникальный id,
+    а позиция в курсоре хранит значения всех полей сортировки.
+    Страница — это условие вида (created_at, id) < (x, y) по индексу (owner, created_at, id),
+    без OFFSET и без дублей/пропусков при одинаковом created_at.
+    NULL (deadline, search_rank) на любой СУБД считается меньше любого значения.
+    """
     page_size = 5
-    ordering = '-created_at'  # Последние задачи первыми
+    ordering = ('-created_at', '-id')  # Последние задачи первыми
+    tiebreaker = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in (self.tiebreaker, 'pk') for field in ordering):
+            # id в том же направлении, что и основная сортировка
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering = (*ordering, prefix + self.tiebreaker)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        self.nullable = {field.lstrip('-') for field in self.ordering if self._is_nullable(queryset, field.lstrip('-'))}
+        queryset = queryset.order_by(*self._order_by(self.ordering if not reverse else _reverse_ordering(self.ordering)))
+
+        if current_position is not None:
+            queryset = queryset.filter(self._keyset_filter(current_position, reverse))
+
+        # Позиции уникальны, поэтому offset не нужен; лишняя строка — признак следующей страницы
+        results = list(queryset[:self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.next_position
+        return self.encode_cursor(self._cursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.previous_position
+        return self.encode_cursor(self._cursor(reverse=True, position=position))
+
+    def _is_nullable(self, queryset, name):
+        if name == 'pk':
+            return False
+        try:
+            return queryset.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return True  # аннотация (search_rank) — может быть NULL
+
+    def _order_by(self, ordering):
+        # NULLS FIRST/LAST только для полей, где NULL возможен: остальные сортируются по индексу как есть
+        result = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if name not in self.nullable:
+                result.append(field)
+            elif field.startswith('-'):
+                result.append(F(name).desc(nulls_last=True))
+            else:
+                result.append(F(name).asc(nulls_first=True))
+        return result
+
+    def _cursor(self, reverse, position):
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def _keyset_filter(self, position, reverse):
+        """(f1, f2, ...) после позиции: f1 > v1 OR (f1 = v1 AND f2 > v2) OR ..."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            if value is None:
+                # NULL — наименьшее: после него по убыванию ничего, по возрастанию — любые значения
+                if not descending:
+                    condition |= equal & Q(**{name + '__isnull': False})
+                equal &= Q(**{name + '__isnull': True})
+                continue
+            after = Q(**{name + ('__lt' if descending else '__gt'): value})
+            if descending and name in self.nullable:
+                after |= Q(**{name + '__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{name: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            # Числа и NULL — как есть в JSON (float без потери точности), даты — ISO 8601
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat()
+            elif value is not None and not isinstance(value, (int, float)):
+                value = str(value)
+            values.append(value)
+        return json.dumps(values, separators=(',', ':'))
@@ -1,15 +1,64 @@
 # myapp/permissions.py
+from django.db.models import Q
 from rest_framework import permissions
 
-class IsOwnerOrReadOnly(permissions.BasePermission):
+
+class OwnerPermission(permissions.BasePermission):
     """
-    Разрешает безопасные методы всем авторизованным,
-    а изменение и удаление — только владельцу.
+    Право владельца, которое сводится к фильтру queryset по owner_id:
+    get_owner_filter() даёт условие для запросов (одна выборка по индексу
+    и находит объект, и проверяет право — чужой объект просто не найден, 404),
+    has_object_permission() сверяет owner_id без загрузки пользователя.
+    read_only_open — безопасные методы разрешены всем.
     """
+    owner_field = 'owner_id'
+    read_only_open = False
+
+    def applies(self, request):
+        return not (self.read_only_open and request.method in permissions.SAFE_METHODS)
+
+    def get_owner_filter(self, request, view):
+        """Q для queryset или None, если для этого запроса ограничения нет."""
+        if not self.applies(request):
+            return None
+        return Q(**{self.owner_field: request.user.id})
 
     def has_object_permission(self, request, view, obj):
-        # Безопасные методы — разрешены всегда
-        if request.method in permissions.SAFE_METHODS:
+        if not self.applies(request):
             return True
-        # Небезопасные — только если пользователь владелец объекта
-        return obj.owner == request.user
+        return getattr(obj, self.owner_field) == request.user.id
+
+
+class IsOwner(OwnerPermission):
+    """Любые действия — только владельцу."""
+
+
+class IsOwnerOrReadOnly(OwnerPermission):
+    """
+    Разрешает безопасные методы всем авторизованным,
+    а изменение и удаление — только владельцу.
+    """
+    read_only_open = True
+
+
+def owner_filter(request, view, permission_objects):
+    """Условия всех OwnerPermission view одним Q (None — без ограничений)."""
+    condition = None
+    for permission in permission_objects:
+        if isinstance(permission, OwnerPermission):
+            part = permission.get_owner_filter(request, view)
+            if part is not None:
+                condition = part if condition is None else condition & part
+    return condition
+
+
+def allowed_ids(request, view, queryset, ids):
+    """
+    Пакетная проверка прав: из ids — те, что существуют и доступны по правам view.
+    Один запрос к столбцам pk/owner_id, без загрузки объектов и пользователей.
+    """
+    condition = owner_filter(request, view, view.get_permissions())
+    queryset = queryset.filter(pk__in=ids)
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    return set(queryset.values_list('pk', flat=True))
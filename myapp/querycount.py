@@ -0,0 +1,33 @@
+# myapp/querycount.py
+
+import time
+
+
+class QueryCounter:
+    """
+    Обёртка для connection.execute_wrapper — считает выполненные SQL-запросы,
+    их суммарное время и самый медленный запрос.
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            ...
+        counter.count, counter.duration, counter.slowest_sql
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # с
+        self.slowest = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.duration += elapsed
+            if elapsed > self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
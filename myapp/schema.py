@@ -0,0 +1,107 @@
+# myapp/schema.py
+
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+# drf_yasg импортируется только здесь и только при генерации схемы —
+# страницы /swagger/ и /redoc/ и воркеры, которые документацию не отдают, его не загружают
+
+TITLE = 'Task API'
+
+FORMATS = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+_documents = {}  # format -> (content, etag)
+_lock = threading.Lock()
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title=TITLE,
+        default_version='v1',
+        description="API документация для Task Management System",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="support@example.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def ui_page(request, template):
+    """Статическая страница: схему браузер берёт из schema_document, генератор не вызывается."""
+    spec_url = reverse('schema-document', kwargs={'format': 'json'})
+    return render(request, template, {'title': TITLE, 'spec_url': spec_url})
+
+
+@require_safe
+def swagger_ui(request):
+    return ui_page(request, 'myapp/swagger-ui.html')
+
+
+@require_safe
+def redoc_ui(request):
+    return ui_page(request, 'myapp/redoc.html')
+
+
+def generate(format):
+    """Схема OpenAPI в формате format ('json' / 'yaml'), байты."""
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(get_info()).get_schema(request=None, public=True)
+    codec = OpenAPICodecJson(validators=[]) if format == 'json' else OpenAPICodecYaml(validators=[])
+    return codec.encode(schema)
+
+
+def schema_path(format):
+    directory = getattr(settings, 'OPENAPI_SCHEMA_DIR', None)
+    return os.path.join(directory, f'openapi.{format}') if directory else None
+
+
+def get_document(format):
+    """
+    (содержимое, ETag): из памяти процесса, иначе из файла, сохранённого командой
+    generate_openapi_schema при деплое, иначе генерируется один раз на процесс.
+    """
+    document = _documents.get(format)
+    if document is not None:
+        return document
+    with _lock:
+        if format not in _documents:
+            path = schema_path(format)
+            if path and os.path.exists(path):
+                with open(path, 'rb') as file:
+                    content = file.read()
+            else:
+                content = generate(format)
+            _documents[format] = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        return _documents[format]
+
+
+def clear():
+    with _lock:
+        _documents.clear()
+
+
+@require_safe
+def schema_document(request, format):
+    """Готовая схема с ETag: повторный запрос браузера получает 304."""
+    content, etag = get_document(format)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=FORMATS[format])
+    response['ETag'] = etag
+    # Кэшировать можно, но перепроверять каждый раз — схема меняется с деплоем
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
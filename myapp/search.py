@@ -0,0 +1,131 @@
+# myapp/search.py
+
+import re
+
+from django.db import connection as default_connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+# Таблица -> поля полнотекстового индекса
+SEARCH_INDEXES = {
+    'myapp_task': ('title', 'description'),
+    'myapp_subtask': ('title', 'description'),
+}
+
+MYSQL_MIN_TOKEN_SIZE = 3  # innodb_ft_min_token_size по умолчанию
+MYSQL_OPERATORS = re.compile(r'[+\-><()~*"@]+')
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def _sqlite_statements(table, columns):
+    fts = _fts_table(table)
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return {
+        fts: f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', "
+             f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f'{fts}_ai': f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f'{fts}_ad': f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f'{fts}_au': f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} "
+                     f"BEGIN {delete_old} {insert_new} END",
+    }
+
+
+def ensure_search_index(connection):
+    """
+    Создаёт полнотекстовый индекс, если его нет. Идемпотентно.
+
+    SQLite: внешняя FTS5-таблица + триггеры синхронизации. Django при некоторых
+    миграциях пересоздаёт таблицу и теряет триггеры — поэтому функция вызывается
+    и из post_migrate (myapp/signals.py) и при необходимости перестраивает индекс.
+    MySQL: FULLTEXT-индекс, InnoDB обновляет его сам.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            existing_tables = set(connection.introspection.table_names(cursor))
+            for table, columns in SEARCH_INDEXES.items():
+                if table not in existing_tables:
+                    continue
+                statements = _sqlite_statements(table, columns)
+                cursor.execute("SELECT name FROM sqlite_master WHERE name IN (%s)"
+                               % ', '.join(['%s'] * len(statements)), list(statements))
+                present = {row[0] for row in cursor.fetchall()}
+                if present == set(statements):
+                    continue
+                for statement in statements.values():
+                    cursor.execute(statement)
+                fts = _fts_table(table)
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    elif connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            for table, columns in SEARCH_INDEXES.items():
+                constraints = connection.introspection.get_constraints(cursor, table)
+                if f'{table}_fulltext' in constraints:
+                    continue
+                cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {table}_fulltext ({', '.join(columns)})")
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        for table in SEARCH_INDEXES:
+            if connection.vendor == 'sqlite':
+                fts = _fts_table(table)
+                for suffix in ('_ai', '_ad', '_au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {fts}{suffix}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif connection.vendor == 'mysql':
+                cursor.execute(f'ALTER TABLE {table} DROP INDEX {table}_fulltext')
+
+
+def install_search_index(apps, schema_editor):
+    ensure_search_index(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+def is_supported(queryset, terms, connection=default_connection):
+    if queryset.model._meta.db_table not in SEARCH_INDEXES:
+        return False
+    if connection.vendor == 'sqlite':
+        return True
+    if connection.vendor == 'mysql':
+        # Слова короче innodb_ft_min_token_size FULLTEXT не индексирует
+        words = MYSQL_OPERATORS.sub(' ', ' '.join(terms)).split()
+        return bool(words) and all(len(word) >= MYSQL_MIN_TOKEN_SIZE for word in words)
+    return False
+
+
+def search(queryset, terms, connection=default_connection):
+    """
+    Фильтрует queryset по полнотекстовому индексу и добавляет аннотацию
+    search_rank (больше — релевантнее). Все слова обязательны, каждое — как префикс.
+    """
+    table = queryset.model._meta.db_table
+    columns = SEARCH_INDEXES[table]
+    pk = f'{table}.{queryset.model._meta.pk.column}'
+
+    if connection.vendor == 'sqlite':
+        fts = _fts_table(table)
+        query = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        # bm25: меньше — лучше, поэтому знак меняется; title весит больше description
+        weights = ', '.join(['10.0'] + ['1.0'] * (len(columns) - 1))
+        rank = RawSQL(
+            f'SELECT -bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {pk}',
+            [query], output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [query])
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    words = MYSQL_OPERATORS.sub(' ', ' '.join(terms)).split()
+    query = ' '.join(f'+{word}*' for word in words)
+    match = ', '.join(f'{table}.{column}' for column in columns)
+    rank = RawSQL(f'MATCH ({match}) AGAINST (%s IN BOOLEAN MODE)', [query], output_field=FloatField())
+    return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
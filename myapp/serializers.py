@@ -1,12 +1,141 @@
 # DjangoProject/myapp/serializers.py
 
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import MANY_RELATION_KWARGS
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch
 from myapp.models import Task, SubTask, Category
+from myapp.categories import category_names
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 
 
+def requested_fields(request, available):
+    """
+    Поля ответа по ?fields=a,b / ?omit=c — только для чтения (GET, HEAD, OPTIONS).
+    None — параметров нет, нужны все поля. Неизвестные имена игнорируются.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+    names = list(available)
+    if fields:
+        wanted = {name.strip() for name in fields.split(',')}
+        names = [name for name in names if name in wanted]
+    if omit:
+        unwanted = {name.strip() for name in omit.split(',')}
+        names = [name for name in names if name not in unwanted]
+    return names
+
+
+class EagerLoadingMixin:
+    """
+    Сериализатор объявляет связи, которые он читает, а view подгружает их
+    заранее через setup_eager_loading (см. myapp/mixins.py), без запроса на каждую строку.
+    С fields — только связи и столбцы этих полей (плюс keep, например поля сортировки).
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, keep=()):
+        select_related = [name for name in cls.select_related_fields if fields is None or name in fields]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if cls.prefetch_related_fields:
+            prefetch = [lookup for lookup in cls.get_prefetch_related_fields()
+                        if fields is None or cls._prefetch_root(lookup) in fields]
+            if prefetch:
+                queryset = queryset.prefetch_related(*prefetch)
+        if fields is not None:
+            queryset = queryset.only(*cls._columns(queryset.model, [*fields, *keep]))
+        return queryset
+
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        return cls.prefetch_related_fields
+
+    @staticmethod
+    def _prefetch_root(lookup):
+        lookup = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        return lookup.split('__')[0]
+
+    @staticmethod
+    def _columns(model, names):
+        # Только собственные столбцы модели: m2m и обратные связи грузит prefetch
+        columns = [model._meta.pk.name]
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many and name not in columns:
+                columns.append(name)
+        return columns
+
+
+class DynamicFieldsMixin:
+    """Убирает из ответа поля, не запрошенные через ?fields= / ?omit= (см. requested_fields)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        names = requested_fields(self.context.get('request'), self.fields)
+        if names is not None:
+            for name in set(self.fields) - set(names):
+                self.fields.pop(name)
+
+
+class CategoryNamesField(serializers.ManyRelatedField):
+    """Список категорий по именам: все имена разрешаются разом через кэш, без запроса на каждое."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.resolve(list(data))
+
+
+class CategoryNameField(serializers.SlugRelatedField):
+    """
+    Категория по имени через myapp.categories.category_names.
+    Возвращает объекты-заглушки (id и name) — для set() связей этого достаточно.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'name')
+        kwargs.setdefault('queryset', Category.objects.all())
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CategoryNamesField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        return self.resolve([data])[0]
+
+    def resolve(self, names):
+        if not all(isinstance(name, (str, int)) and not isinstance(name, bool) for name in names):
+            self.fail('invalid')
+        names = [str(name) for name in names]
+        found = category_names.resolve(names)
+        for name in names:
+            if name not in found:
+                self.fail('does_not_exist', slug_name=self.slug_field, value=name)
+        db = router.db_for_read(Category)
+        return [Category.from_db(db, ['id', 'name'], [found[name], name]) for name in names]
+
+
 class CategoryCreateSerializer(serializers.ModelSerializer):
     task_count = serializers.IntegerField(read_only=True, required=False)  # Добавляем task_count
 
@@ -14,34 +143,42 @@ class CategoryCreateSerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'task_count']  # Добавляем task_count в fields
         read_only_fields = ['id']
+        # Уникальность проверяет сама база (ограничение unique), без отдельного запроса exists()
+        extra_kwargs = {'name': {'validators': []}}
 
     def create(self, validated_data):
-        name = validated_data.get('name')
-        if Category.objects.filter(name=name).exists():
-            raise serializers.ValidationError({"name": "Category with this name already exists."})
-        return super().create(validated_data)
+        # Создать или взять существующую: вставка с ON CONFLICT, удалённая категория восстанавливается;
+        # id и task_count — из той же вставки или чтения существующей строки
+        category, = Category.objects.upsert_names([validated_data['name']])
+        return category
 
     def update(self, instance, validated_data):
-        name = validated_data.get('name')
-        if name != instance.name and Category.objects.filter(name=name).exists():
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
             raise serializers.ValidationError({"name": "Category with this name already exists."})
-        return super().update(instance, validated_data)
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('owner',)
+    prefetch_related_fields = ('categories',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        # Порядок категорий фиксирован — такой же отдаёт TaskValuesSerializer
+        return [Prefetch('categories', queryset=Category.objects.order_by('pk'))]
+
     owner = serializers.StringRelatedField(read_only=True)
-    categories = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        many=True,
-        required=False,
-        slug_field='name'
-    )
+    categories = CategoryNameField(many=True, required=False)
 
     class Meta:
         model = Task
         fields = ['id', 'title', 'description', 'status', 'deadline', 'created_at', 'categories', 'owner']
         read_only_fields = ['id', 'created_at', 'owner']
 
-class SubTaskCreateSerializer(serializers.ModelSerializer):
+class SubTaskCreateSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('owner',)
+
     owner = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -49,29 +186,31 @@ class SubTaskCreateSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'task', 'status', 'deadline', 'created_at', 'owner']
         read_only_fields = ['id', 'created_at', 'owner']
 
-class TaskDetailSerializer(serializers.ModelSerializer):
+class TaskDetailSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('owner',)
+    prefetch_related_fields = ('categories', 'subtasks')
+
     subtasks = SubTaskCreateSerializer(many=True, read_only=True)
     owner = serializers.StringRelatedField(read_only=True)
-    categories = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        many=True,
-        required=False,
-        slug_field='name'
-    )
+    categories = CategoryNameField(many=True, required=False)
 
     class Meta:
         model = Task
         fields = ['id', 'title', 'description', 'status', 'deadline', 'created_at', 'subtasks', 'categories', 'owner']
         read_only_fields = ['id', 'created_at', 'subtasks', 'owner']
 
-class TaskCreateSerializer(serializers.ModelSerializer):
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        # Подзадачи подгружаются вместе со связями вложенного сериализатора
+        subtasks = Prefetch('subtasks', queryset=SubTaskCreateSerializer.setup_eager_loading(SubTask.objects.all()))
+        return ['categories', subtasks]
+
+class TaskCreateSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('owner',)
+    prefetch_related_fields = ('categories',)
+
     owner = serializers.StringRelatedField(read_only=True)
-    categories = serializers.SlugRelatedField(
-        queryset=Category.objects.all(),
-        many=True,
-        required=False,
-        slug_field='name'
-    )
+    categories = CategoryNameField(many=True, required=False)
 
     class Meta:
         model = Task
@@ -83,6 +222,102 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Deadline cannot be in the past.")
         return value
 
+class TaskBulkSerializer(TaskCreateSerializer):
+    """
+    Элемент пакета tasks/bulk/. Категории приходят именами и разрешаются
+    одним запросом на весь пакет (myapp/bulk.py), а не запросом на каждое имя.
+    """
+    categories = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+
+
+class SubTaskBulkSerializer(SubTaskCreateSerializer):
+    """Элемент пакета subtasks/bulk/: задачи проверяются одним запросом на весь пакет."""
+    task = serializers.IntegerField()
+
+
+class ValuesListSerializer:
+    """
+    Быстрый путь чтения списков: строки берутся через values(), без создания
+    экземпляров моделей и без to_representation каждого поля ModelSerializer.
+    Формат ответа — как у serializer_class (порядок полей из его Meta.fields).
+
+    sources — поле ответа -> путь для values(); datetime_fields форматируются
+    тем же DateTimeField DRF; поля, которых нет в sources, заполняет get_related().
+    ?fields= / ?omit= сужают и ответ, и список столбцов.
+    """
+    serializer_class = None
+    sources = {}
+    datetime_fields = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        names = requested_fields(self.context.get('request'), self.serializer_class.Meta.fields)
+        if names is None:
+            names = self.serializer_class.Meta.fields
+        datetime_field = serializers.DateTimeField()
+        self.plan = []
+        for name in names:
+            if name in self.sources:
+                convert = datetime_field.to_representation if name in self.datetime_fields else None
+                self.plan.append((name, self.sources[name], convert))
+            else:
+                self.plan.append((name, None, None))
+
+    def get_rows(self, queryset, keep=()):
+        # id нужен для связанных полей, keep и аннотации (search_rank) — для сортировки и курсора
+        columns = dict.fromkeys(['id', *keep, *(source for _, source, _ in self.plan if source is not None)])
+        return queryset.prefetch_related(None).values(*columns, *queryset.query.annotations)
+
+    def get_related(self, rows):
+        """{поле: {pk: значение}} для полей, которых нет в values()."""
+        return {}
+
+    def to_representation(self, rows):
+        related = self.get_related(rows) if any(source is None for _, source, _ in self.plan) else {}
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.plan:
+                if source is None:
+                    item[name] = related[name].get(row['id'], [])
+                    continue
+                value = row[source]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+
+class TaskValuesSerializer(ValuesListSerializer):
+    serializer_class = TaskSerializer
+    sources = {
+        'id': 'id', 'title': 'title', 'description': 'description', 'status': 'status',
+        'deadline': 'deadline', 'created_at': 'created_at', 'owner': 'owner__username',
+    }
+    datetime_fields = ('deadline', 'created_at')
+
+    def get_related(self, rows):
+        # Категории всей страницы — один запрос по связующей таблице
+        categories = {row['id']: [] for row in rows}
+        links = (Task.categories.through.objects
+                 .filter(task_id__in=list(categories), category__is_deleted=False)
+                 .order_by('task_id', 'category_id')
+                 .values_list('task_id', 'category__name'))
+        for task_id, name in (links if categories else ()):
+            categories[task_id].append(name)
+        return {'categories': categories}
+
+
+class SubTaskValuesSerializer(ValuesListSerializer):
+    serializer_class = SubTaskCreateSerializer
+    sources = {
+        'id': 'id', 'title': 'title', 'description': 'description', 'task': 'task_id', 'status': 'status',
+        'deadline': 'deadline', 'created_at': 'created_at', 'owner': 'owner__username',
+    }
+    datetime_fields = ('deadline', 'created_at')
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)  # подтверждение
@@ -0,0 +1,151 @@
+# myapp/signals.py
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import (m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from myapp import categories, search, stats, versions
+from myapp.categories import category_names
+from myapp.models import Category, SubTask, Task, Tombstone
+
+STATS_FIELDS = {'owner', 'owner_id', 'status', 'deadline'}
+
+
+@receiver(post_init, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    # Запоминаем состояние загруженной задачи, чтобы при save() не читать её заново
+    if instance.pk is not None and all(f in instance.__dict__ for f in ('owner_id', 'status', 'deadline')):
+        instance._stats_snapshot = stats.snapshot(instance)
+
+
+@receiver(pre_save, sender=Task)
+def capture_task_state(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        instance._stats_old = None
+    elif hasattr(instance, '_stats_snapshot'):
+        instance._stats_old = instance._stats_snapshot
+    else:
+        instance._stats_old = (Task.objects.filter(pk=instance.pk)
+                               .values_list('owner_id', 'status', 'deadline').first())
+
+
+@receiver(post_save, sender=Task)
+def update_task_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    old = instance.__dict__.pop('_stats_old', None)
+    if update_fields is not None and not STATS_FIELDS & set(update_fields):
+        return
+    new = stats.snapshot(instance)
+    if created or old != new:
+        stats.record_changes([old], [new])
+    instance._stats_snapshot = new
+
+
+@receiver(post_delete, sender=Task)
+def update_task_stats_on_delete(sender, instance, **kwargs):
+    stats.record_changes([stats.snapshot(instance)], [None])
+
+
+# Сохранение Task/SubTask само берёт новую версию владельца (SyncTrackedModel.save)
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    if instance.owner_id not in versions.deleted_owner_ids(origin):
+        versions.record_deletion(instance, Tombstone.KIND_TASK)
+
+
+@receiver(post_delete, sender=SubTask)
+def record_subtask_tombstone(sender, instance, origin=None, **kwargs):
+    if instance.owner_id not in versions.deleted_owner_ids(origin):
+        versions.record_deletion(instance, Tombstone.KIND_SUBTASK)
+
+
+@receiver([post_save, post_delete], sender=SubTask)
+def bump_version_on_subtask_change(sender, instance, origin=None, **kwargs):
+    # Подзадачи видны в TaskDetailSerializer задачи — её владелец тоже получает новую версию
+    deleted_owners = versions.deleted_owner_ids(origin)
+    if SubTask.task.is_cached(instance):
+        owner_ids = {instance.task.owner_id}
+    elif deleted_owners:
+        owner_ids = set(Task.objects.filter(pk=instance.task_id).values_list('owner_id', flat=True))
+    else:
+        versions.bump_for_tasks([instance.task_id])
+        return
+    versions.bump(owner_ids - deleted_owners)
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def touch_tasks_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            versions.touch_tasks([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        versions.touch_tasks(pk_set)
+    elif action == 'pre_clear':
+        versions.touch_tasks(sender.objects.filter(category_id=instance.pk).values_list('task_id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def touch_tasks_on_category_change(sender, instance, created, **kwargs):
+    # Переименование или мягкое удаление меняет представление всех связанных задач
+    if not created:
+        versions.touch_tasks(sender.task.through.objects.filter(category_id=instance.pk)
+                             .values_list('task_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def update_category_task_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set в post_add — только реально добавленные связи, в remove — запрошенные,
+    # поэтому существующие связи для remove/clear считаются в pre_*
+    if action == 'post_add' and pk_set:
+        if reverse:
+            categories.adjust_task_counts({instance.pk: len(pk_set)})
+        else:
+            categories.adjust_task_counts(dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        links = sender.objects.filter(**{'category_id' if reverse else 'task_id': instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{'task_id__in' if reverse else 'category_id__in': pk_set})
+        if reverse:
+            instance._task_count_removed = {instance.pk: -links.count()}
+        else:
+            instance._task_count_removed = {pk: -count for pk, count in categories.link_counts(links).items()}
+    elif action in ('post_remove', 'post_clear'):
+        categories.adjust_task_counts(instance.__dict__.pop('_task_count_removed', {}))
+
+
+@receiver(pre_delete, sender=Task)
+def release_task_categories(sender, instance, **kwargs):
+    # Связи удаляются каскадом без сигналов — снимаем их со счётчиков до удаления
+    if not categories.is_releasing():
+        categories.release_tasks([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_name(sender, instance, **kwargs):
+    # Сразу — для этой транзакции, после коммита — на случай, если кто-то успел закэшировать старое
+    category_names.invalidate(instance.pk, instance.name)
+    transaction.on_commit(lambda: category_names.invalidate(instance.pk, instance.name))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Импорт здесь: simplejwt не нужен при старте воркера (manage.py profile_startup)
+    from myapp.authentication import user_cache
+
+    # Как с категориями: сразу и после коммита
+    user_cache.invalidate(instance.pk)
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using='default', **kwargs):
+    # Миграции SQLite, пересоздающие таблицу, удаляют FTS-триггеры — возвращаем их
+    if sender.name != 'myapp':
+        return
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('myapp', '0005_fulltext_search_index') in applied:
+        search.ensure_search_index(connection)
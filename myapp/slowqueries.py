@@ -0,0 +1,124 @@
+# myapp/slowqueries.py
+
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import transaction
+
+from myapp.middleware import current_request, get_route
+
+logger = logging.getLogger('myapp.slow_queries')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+_VALUES = re.compile(r'(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без литералов: строки и числа -> ?, списки IN (...) и многострочные VALUES свёрнуты."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _VALUES.sub(r'\1, ...', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class SlowQueryLogger:
+    """
+    Обёртка для connection.execute_wrapper: пишет в лог myapp.slow_queries запросы дольше
+    SLOW_QUERY_MS и долю SLOW_QUERY_SAMPLE_RATE остальных — с отпечатком SQL, временем,
+    маршрутом запроса и, если SLOW_QUERY_EXPLAIN, планом медленного SELECT.
+    Ставится на каждое новое соединение (connection_created, см. install).
+
+    По отпечатку копится число попаданий в лог, суммарное и максимальное время (stats()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        threshold = getattr(settings, 'SLOW_QUERY_MS', 100)
+        if threshold is None:
+            # Выключен после того, как обёртка уже стоит на соединении
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        slow = duration_ms >= threshold
+        if not slow:
+            rate = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 0.0)
+            if not rate or random.random() >= rate:
+                return result
+        self.record(context['connection'], sql, params, many, duration_ms, slow)
+        return result
+
+    def record(self, connection, sql, params, many, duration_ms, slow):
+        text = fingerprint(sql)
+        key = hashlib.md5(text.encode()).hexdigest()[:12]
+        with self._lock:
+            count, total, worst, _ = self._stats.get(key, (0, 0.0, 0.0, text))
+            count += 1
+            self._stats[key] = (count, total + duration_ms, max(worst, duration_ms), text)
+
+        request = current_request.get()
+        route = get_route(request) if request is not None else None
+        plan = None
+        if slow and not many and getattr(settings, 'SLOW_QUERY_EXPLAIN', False) and \
+                sql.lstrip()[:6].upper() == 'SELECT':
+            plan = self.explain(connection, sql, params)
+
+        fields = {
+            'fingerprint': key, 'sql': text, 'duration_ms': round(duration_ms, 2),
+            'route': route, 'slow': slow, 'seen': count, 'plan': plan,
+        }
+        logger.info(
+            '%s duration_ms=%.2f route=%s fingerprint=%s seen=%s sql=%s%s',
+            'slow' if slow else 'sampled', duration_ms, route or '-', key, count, text,
+            f'\n{plan}' if plan else '',
+            extra=fields,
+        )
+
+    def explain(self, connection, sql, params):
+        # План запрашиваем без обёрток: его не логируем и не считаем в QueryCounter
+        wrappers, connection.execute_wrappers = connection.execute_wrappers, []
+        try:
+            # Внутри транзакции — в точке сохранения, чтобы ошибка EXPLAIN её не испортила
+            savepoint = transaction.atomic(using=connection.alias) if connection.in_atomic_block else nullcontext()
+            with savepoint, connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except Exception:
+            # План — не главное: транзакция в ошибке, неподдерживаемый запрос и т. п.
+            return None
+        finally:
+            connection.execute_wrappers = wrappers
+
+    def stats(self):
+        """[(отпечаток, число, суммарное мс, максимальное мс, SQL)] по убыванию суммарного времени."""
+        with self._lock:
+            rows = [(key, count, total, worst, text) for key, (count, total, worst, text) in self._stats.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+slow_query_logger = SlowQueryLogger()
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: обёртка на соединение, если логирование не выключено (SLOW_QUERY_MS = None)."""
+    if getattr(settings, 'SLOW_QUERY_MS', 100) is None:
+        return
+    if slow_query_logger not in connection.execute_wrappers:
+        # В начало: соединение может открыться внутри «with connection.execute_wrapper(...)»,
+        # который на выходе снимает последнюю обёртку
+        connection.execute_wrappers.insert(0, slow_query_logger)
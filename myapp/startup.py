@@ -0,0 +1,95 @@
+# myapp/startup.py
+
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Выполняется в отдельном интерпретаторе: django.setup() с замером import_models() и ready()
+# каждого приложения, затем (по желанию) импорт ROOT_URLCONF — его платит первый запрос
+PROBE = '''
+import json, sys, time
+from django.apps.config import AppConfig
+from django.apps.registry import Apps
+
+timings = {'models': {}, 'ready': {}}
+import_models, get_app_configs = AppConfig.import_models, Apps.get_app_configs
+
+def timed(kind, label, method):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[kind][label] = time.perf_counter() - start
+    return wrapper
+
+def timed_import_models(self):
+    return timed('models', self.label, import_models)(self)
+
+def timed_get_app_configs(self):
+    # populate() вызывает ready() у конфигов из get_app_configs()
+    configs = list(get_app_configs(self))
+    for config in configs:
+        config.ready = timed('ready', config.label, config.ready)
+    return configs
+
+AppConfig.import_models, Apps.get_app_configs = timed_import_models, timed_get_app_configs
+start = time.perf_counter()
+import django
+django.setup()
+timings['setup'] = time.perf_counter() - start
+AppConfig.import_models, Apps.get_app_configs = import_models, get_app_configs
+timings['setup_modules'] = sorted(sys.modules)
+
+if URLS:
+    from django.conf import settings
+    start = time.perf_counter()
+    __import__(settings.ROOT_URLCONF)
+    timings['urlconf'] = time.perf_counter() - start
+print('@@probe@@' + json.dumps(timings))
+'''
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def parse_importtime(text):
+    """Строки -X importtime -> [(модуль, собственное мкс, суммарное мкс, глубина)]."""
+    rows = []
+    for line in text.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((module, int(own), int(cumulative), len(indent) // 2))
+    return rows
+
+
+def probe(urls=False, importtime=True):
+    """
+    Холодный старт в новом интерпретаторе: {'setup', 'urlconf', 'models', 'ready',
+    'setup_modules', 'imports'} — время в секундах, imports — строки parse_importtime.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+    result = subprocess.run(command + ['-c', f'URLS = {bool(urls)}\n' + PROBE], env=env,
+                            cwd=settings.BASE_DIR, capture_output=True, text=True)
+    output = [line for line in result.stdout.splitlines() if line.startswith('@@probe@@')]
+    if result.returncode or not output:
+        raise RuntimeError(f'Startup probe failed:\n{result.stderr[-4000:]}')
+    timings = json.loads(output[-1][len('@@probe@@'):])
+    timings['imports'] = parse_importtime(result.stderr) if importtime else []
+    return timings
+
+
+def package_totals(imports):
+    """Собственное время импорта, просуммированное по пакетам верхнего уровня."""
+    totals = defaultdict(int)
+    for module, own, _, _ in imports:
+        totals[module.split('.')[0]] += own
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,185 @@
+# myapp/stats.py
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from myapp.models import Task, TaskStats
+
+COUNTER_FIELDS = ['total', *TaskStats.STATUS_FIELDS.values(), 'overdue']
+
+_pending = ContextVar('task_stats_pending', default=None)
+
+
+def snapshot(task):
+    """Всё, от чего зависят счётчики: (owner_id, status, deadline)."""
+    return (task.owner_id, task.status, task.deadline)
+
+
+def _contribution(snap, now):
+    _, status, deadline = snap
+    fields = {'total': 1}
+    status_field = TaskStats.STATUS_FIELDS.get(status)
+    if status_field:
+        fields[status_field] = 1
+    if status in Task.OPEN_STATUSES and deadline is not None and deadline < now:
+        fields['overdue'] = 1
+    return fields
+
+
+@contextmanager
+def batch():
+    """
+    Копит изменения (в том числе из сигналов) и применяет их одним набором
+    UPDATE при выходе из блока. При исключении ничего не применяется.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    old_snapshots, new_snapshots = [], []
+    token = _pending.set((old_snapshots, new_snapshots))
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    _apply_changes(old_snapshots, new_snapshots)
+
+
+def record_changes(old_snapshots, new_snapshots):
+    """
+    Применяет к TaskStats разницу между старыми и новыми снимками задач.
+    None вместо старого снимка — задача создана, вместо нового — удалена.
+    """
+    pending = _pending.get()
+    if pending is not None:
+        pending[0].extend(old_snapshots)
+        pending[1].extend(new_snapshots)
+        return
+    _apply_changes(old_snapshots, new_snapshots)
+
+
+def _apply_changes(old_snapshots, new_snapshots):
+    now = timezone.now()
+    deltas = defaultdict(lambda: defaultdict(int))
+    boundaries = {}  # scope -> ближайший будущий дедлайн открытой задачи
+
+    for old, new in zip(old_snapshots, new_snapshots):
+        for snap, sign in ((old, -1), (new, 1)):
+            if snap is None:
+                continue
+            scopes = (TaskStats.GLOBAL_SCOPE, snap[0])
+            for field, value in _contribution(snap, now).items():
+                for scope in scopes:
+                    deltas[scope][field] += sign * value
+            _, status, deadline = snap
+            if sign > 0 and status in Task.OPEN_STATUSES and deadline is not None and deadline >= now:
+                for scope in scopes:
+                    if scope not in boundaries or deadline < boundaries[scope]:
+                        boundaries[scope] = deadline
+
+    # Одинаковые дельты (глобальная строка + строка владельца) — один UPDATE
+    grouped = defaultdict(list)
+    for scope, fields in deltas.items():
+        key = tuple(sorted((field, value) for field, value in fields.items() if value))
+        if key:
+            grouped[key].append(scope)
+
+    missing = set()
+    for key, scopes in grouped.items():
+        updated = TaskStats.objects.filter(scope__in=scopes).update(
+            **{field: F(field) + value for field, value in key}
+        )
+        if updated < len(scopes):
+            existing = set(TaskStats.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+            missing.update(set(scopes) - existing)
+
+    by_boundary = defaultdict(list)
+    for scope, deadline in boundaries.items():
+        if scope not in missing:
+            by_boundary[deadline].append(scope)
+    for deadline, scopes in by_boundary.items():
+        TaskStats.objects.filter(scope__in=scopes).filter(
+            Q(overdue_valid_until__isnull=True) | Q(overdue_valid_until__gt=deadline)
+        ).update(overdue_valid_until=deadline)
+
+    # Строки ещё нет — считаем её с нуля, изменение уже в базе
+    for scope in missing:
+        rebuild_scope(scope, now)
+
+
+def compute_counters(now=None, owner_id=None):
+    """
+    Считает счётчики по таблице Task: {scope: {поле: значение}}.
+    owner_id — только для одного владельца (и без глобальной строки).
+    """
+    now = now or timezone.now()
+    queryset = Task.objects.all()
+    if owner_id is not None:
+        queryset = queryset.filter(owner_id=owner_id)
+
+    def empty():
+        return {**dict.fromkeys(COUNTER_FIELDS, 0), 'overdue_valid_until': None}
+
+    result = defaultdict(empty)
+    if owner_id is None:
+        result[TaskStats.GLOBAL_SCOPE] = empty()
+    else:
+        result[owner_id] = empty()
+
+    open_tasks = Q(status__in=Task.OPEN_STATUSES)
+    rows = (queryset.values('owner_id', 'status')
+            .annotate(count=Count('id'),
+                      overdue=Count('id', filter=open_tasks & Q(deadline__lt=now)),
+                      next_deadline=Min('deadline', filter=open_tasks & Q(deadline__gte=now)))
+            .order_by())
+    for row in rows:
+        scopes = [row['owner_id']] if owner_id is not None else [TaskStats.GLOBAL_SCOPE, row['owner_id']]
+        status_field = TaskStats.STATUS_FIELDS.get(row['status'])
+        for scope in scopes:
+            counters = result[scope]
+            counters['total'] += row['count']
+            if status_field:
+                counters[status_field] += row['count']
+            counters['overdue'] += row['overdue']
+            if row['next_deadline'] is not None and (
+                    counters['overdue_valid_until'] is None
+                    or row['next_deadline'] < counters['overdue_valid_until']):
+                counters['overdue_valid_until'] = row['next_deadline']
+    return dict(result)
+
+
+def rebuild_scope(scope, now=None):
+    owner_id = None if scope == TaskStats.GLOBAL_SCOPE else scope
+    counters = compute_counters(now, owner_id=owner_id)[scope]
+    stats, _ = TaskStats.objects.update_or_create(scope=scope, defaults=counters)
+    return stats
+
+
+def refresh_overdue(stats, now):
+    queryset = Task.objects.filter(status__in=Task.OPEN_STATUSES)
+    if stats.scope != TaskStats.GLOBAL_SCOPE:
+        queryset = queryset.filter(owner_id=stats.scope)
+    with transaction.atomic():
+        stats.overdue = queryset.filter(deadline__lt=now).count()
+        stats.overdue_valid_until = queryset.filter(deadline__gte=now).aggregate(
+            next_deadline=Min('deadline'))['next_deadline']
+        TaskStats.objects.filter(pk=stats.pk).update(
+            overdue=stats.overdue, overdue_valid_until=stats.overdue_valid_until
+        )
+    return stats
+
+
+def get_task_stats(scope=TaskStats.GLOBAL_SCOPE):
+    """Обычно — одно чтение по первичному ключу."""
+    now = timezone.now()
+    try:
+        stats = TaskStats.objects.get(pk=scope)
+    except TaskStats.DoesNotExist:
+        return rebuild_scope(scope, now)
+    if stats.overdue_valid_until is not None and stats.overdue_valid_until <= now:
+        refresh_overdue(stats, now)
+    return stats
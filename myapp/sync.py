@@ -0,0 +1,137 @@
+# myapp/sync.py
+
+import base64
+import heapq
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from myapp.mixins import QueryBudgetMixin
+from myapp.models import OwnerVersion, SubTask, Task, Tombstone
+from myapp.serializers import SubTaskCreateSerializer, TaskSerializer
+
+
+class SyncTokenExpired(NotFound):
+    status_code = 410
+    default_detail = 'Sync token expired, full resync required.'
+    default_code = 'sync_token_expired'
+
+
+def encode_token(position):
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token):
+    """
+    Позиция (version, source, id, floor) из непрозрачного токена; floor — порог
+    надгробий владельца на момент выдачи токена (в старых токенах его нет — 0).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(raw)
+    except ValueError:
+        raise ValidationError({'since': ['Invalid sync token.']})
+    if (not isinstance(position, list) or len(position) not in (3, 4)
+            or not all(isinstance(value, int) and not isinstance(value, bool) for value in position)):
+        raise ValidationError({'since': ['Invalid sync token.']})
+    return tuple(position) if len(position) == 4 else (*position, 0)
+
+
+class ChangesView(QueryBudgetMixin, APIView):
+    """
+    Лента изменений пользователя после токена: GET changes/?since=<token>&limit=N.
+
+    Каждая запись задачи/подзадачи несёт sync_version — версию владельца на момент
+    записи, удаления оставляют Tombstone с такой же версией. Три источника читаются
+    по индексам (owner, version, id) условием «после позиции» и сливаются
+    по ключу (version, source, id), так что стоимость опроса зависит от числа
+    изменений, а не от размера данных. Без since — полная выгрузка теми же страницами.
+
+        {"changes": [{"kind": "task", "op": "upsert", "id": 1, "data": {...}},
+                     {"kind": "subtask", "op": "delete", "id": 7}],
+         "next": "<token>", "has_more": false}
+
+    Клиент сохраняет next и передаёт его в since; пустые changes — новых изменений нет.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 6  # пользователь + версия + задачи + категории + подзадачи + надгробия
+    default_limit = 100
+    max_limit = 1000
+
+    SOURCE_TASK, SOURCE_SUBTASK, SOURCE_TOMBSTONE = 0, 1, 2
+
+    def get(self, request):
+        position = decode_token(request.query_params['since']) if request.query_params.get('since') else None
+        limit = self.get_limit(request)
+
+        version, floor = (OwnerVersion.objects.filter(owner=request.user)
+                          .values_list('version', 'tombstone_floor').first() or (0, 0))
+        # Надгробия с версией <= floor могли быть удалены. Если порог вырос после выдачи токена,
+        # клиент на позиции не дальше порога мог пропустить удаления (в том числе на самой версии floor).
+        # Порог, известный при выдаче, не мешает: полная синхронизация идёт и по версиям ниже него.
+        if position is not None and floor > position[3] and position[0] <= floor:
+            raise SyncTokenExpired()
+
+        sources = [
+            (self.SOURCE_TASK, 'sync_version',
+             TaskSerializer.setup_eager_loading(Task.objects.filter(owner=request.user))),
+            (self.SOURCE_SUBTASK, 'sync_version',
+             SubTaskCreateSerializer.setup_eager_loading(SubTask.objects.filter(owner=request.user))),
+            (self.SOURCE_TOMBSTONE, 'version', Tombstone.objects.filter(owner=request.user)),
+        ]
+        streams = []
+        for source, version_field, queryset in sources:
+            if position is not None:
+                queryset = queryset.filter(self._after(position, source, version_field))
+            rows = queryset.order_by(version_field, 'id')[:limit + 1]
+            streams.append([(getattr(row, version_field), source, row.pk, row) for row in rows])
+
+        merged = list(heapq.merge(*streams, key=lambda item: item[:3]))
+        page = merged[:limit]
+
+        serializers = {
+            self.SOURCE_TASK: TaskSerializer(context={'request': request}),
+            self.SOURCE_SUBTASK: SubTaskCreateSerializer(context={'request': request}),
+        }
+        changes = []
+        for _, source, pk, row in page:
+            if source == self.SOURCE_TOMBSTONE:
+                changes.append({'kind': row.kind, 'op': 'delete', 'id': row.object_id})
+            else:
+                kind = Tombstone.KIND_TASK if source == self.SOURCE_TASK else Tombstone.KIND_SUBTASK
+                changes.append({'kind': kind, 'op': 'upsert', 'id': pk,
+                                'data': serializers[source].to_representation(row)})
+
+        if page:
+            next_position = page[-1][:3]
+        elif position is not None:
+            next_position = position[:3]
+        else:
+            # Данных нет: любое будущее изменение получит версию больше текущей
+            next_position = (version, -1, 0)
+        return Response({
+            'changes': changes,
+            'next': encode_token([*next_position, floor]),
+            'has_more': len(merged) > limit,
+        })
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        return max(1, min(limit, self.max_limit))
+
+    def _after(self, position, source, version_field):
+        # (version, source, id) > позиции; source у источника постоянный
+        version, last_source, last_id, _ = position
+        if source > last_source:
+            return Q(**{f'{version_field}__gte': version})
+        if source < last_source:
+            return Q(**{f'{version_field}__gt': version})
+        return Q(**{f'{version_field}__gt': version}) | Q(**{version_field: version, 'id__gt': last_id})
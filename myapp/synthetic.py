@@ -0,0 +1,215 @@
+# myapp/synthetic.py
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connections, transaction
+
+from myapp.models import SubTask, Task
+
+# Доли статусов и форма дедлайнов — примерно как в рабочей базе: большая часть задач закрыта,
+# у части открытых дедлайн уже прошёл
+STATUS_WEIGHTS = {'Done': 55, 'In progress': 15, 'New': 15, 'Pending': 10, 'Blocked': 5}
+NO_DEADLINE_SHARE = 0.15
+DESCRIPTION_SHARE = 0.4
+
+VERBS = ('Review', 'Fix', 'Update', 'Write', 'Prepare', 'Check', 'Plan', 'Migrate', 'Test', 'Deploy')
+NOUNS = ('report', 'invoice', 'release', 'docs', 'backup', 'dashboard', 'API', 'budget', 'meeting', 'schema')
+FIRST_NAMES = ('Anna', 'Ivan', 'Maria', 'Oleg', 'Elena', 'Pavel', 'Olga', 'Sergey', 'Irina', 'Dmitry')
+LAST_NAMES = ('Ivanova', 'Petrov', 'Smirnova', 'Kuznetsov', 'Popova', 'Volkov', 'Sokolova', 'Lebedev')
+GENRES = ('FICTION', 'NON_FICTION', 'SCI_FI', 'FANTASY', 'MYSTERY', 'BIOGRAPHY', 'NOT_SET')
+
+_plan = None
+
+
+def init_worker(plan):
+    """Инициализация процесса-воркера: Django и план генерации (диапазоны id, веса владельцев)."""
+    global _plan
+    import django
+
+    django.setup()
+    # При fork соединения родителя не переиспользуются
+    connections.close_all()
+    _plan = plan
+
+
+def jobs(plan):
+    """
+    Задания по фазам: [[(вид, номер пачки), ...], ...]. Фазы выполняются по очереди —
+    строки второй фазы ссылаются на строки первой (FK проверяются при коммите пачки).
+    """
+    def chunks(kind, total):
+        return [(kind, index) for index in range(-(-total // plan['chunk_size']))]
+
+    first = chunks('tasks', plan['tasks']) + chunks('books', plan['books']) + chunks('members', plan['members'])
+    return [phase for phase in (first, chunks('borrows', plan['borrows'])) if phase]
+
+
+def run_job(job):
+    """Генерирует и вставляет одну пачку; возвращает {таблица: число строк}."""
+    kind, index = job
+    # Пачка определяется только seed и своим номером — результат не зависит от числа воркеров
+    rng = random.Random(f'{_plan["seed"]}:{kind}:{index}')
+    start = index * _plan['chunk_size']
+    end = min(start + _plan['chunk_size'], _plan[kind])
+    with transaction.atomic():
+        return GENERATORS[kind](rng, start, end)
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """
+    Отключает auto_now/auto_now_add у полей дат: bulk_create иначе перезапишет
+    сгенерированные created_at/updated_at текущим временем.
+    """
+    fields = [(field, field.auto_now, field.auto_now_add)
+              for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _title(rng, pk):
+    return f'{rng.choice(VERBS)} {rng.choice(NOUNS)} #{pk}'
+
+
+def _description(rng):
+    if rng.random() >= DESCRIPTION_SHARE:
+        return ''
+    return ' '.join(rng.choice(NOUNS) for _ in range(rng.randint(5, 30)))
+
+
+def _moment(rng, now, days):
+    # Квадрат равномерного — свежих записей больше, чем старых
+    return now - timedelta(seconds=days * 86400 * rng.random() ** 2)
+
+
+def _deadline(rng, created_at):
+    if rng.random() < NO_DEADLINE_SHARE:
+        return None
+    return created_at + timedelta(days=rng.lognormvariate(2.3, 0.9))
+
+
+def generate_tasks(rng, start, end):
+    plan = _plan
+    now, days = plan['now'], plan['days']
+    statuses, status_weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+    owners = range(plan['user_base'], plan['user_base'] + plan['users'])
+    categories = plan['category_ids']
+    # У каждой пачки свой диапазон id подзадач — пачки можно вставлять параллельно
+    subtask_id = plan['subtask_base'] + start * plan['max_subtasks']
+
+    tasks, subtasks, links = [], [], []
+    owner_ids = rng.choices(owners, cum_weights=plan['owner_weights'], k=end - start)
+    for offset, owner_id in enumerate(owner_ids):
+        pk = plan['task_base'] + start + offset
+        created_at = _moment(rng, now, days)
+        deadline = _deadline(rng, created_at)
+        status = rng.choices(statuses, weights=status_weights)[0]
+        tasks.append(Task(pk=pk, title=_title(rng, pk), description=_description(rng), status=status,
+                          deadline=deadline, created_at=created_at,
+                          updated_at=created_at + (now - created_at) * rng.random(),
+                          sync_version=1, owner_id=owner_id))
+        for category_id in rng.sample(categories, min(rng.randint(0, plan['max_categories']), len(categories))):
+            links.append(Task.categories.through(task_id=pk, category_id=category_id))
+
+        count = min(int(rng.expovariate(1 / plan['subtasks_per_task'])), plan['max_subtasks']) \
+            if plan['subtasks_per_task'] else 0
+        for _ in range(count):
+            sub_created = created_at + (now - created_at) * rng.random() * 0.1
+            # Подзадачи закрытой задачи почти всегда закрыты
+            sub_status = 'Done' if status == 'Done' and rng.random() < 0.95 \
+                else rng.choices(statuses, weights=status_weights)[0]
+            sub_deadline = _deadline(rng, sub_created)
+            if deadline and (sub_deadline is None or sub_deadline > deadline):
+                sub_deadline = deadline
+            subtasks.append(SubTask(pk=subtask_id, title=_title(rng, subtask_id), description=_description(rng),
+                                    task_id=pk, status=sub_status, deadline=sub_deadline,
+                                    created_at=sub_created, updated_at=sub_created + (now - sub_created) * rng.random(),
+                                    sync_version=1, owner_id=owner_id))
+            subtask_id += 1
+
+    batch_size = plan['batch_size']
+    with keep_timestamps(Task, SubTask):
+        Task.objects.bulk_create(tasks, batch_size=batch_size)
+        SubTask.objects.bulk_create(subtasks, batch_size=batch_size)
+    Task.categories.through.objects.bulk_create(links, batch_size=batch_size)
+    return {'tasks': len(tasks), 'subtasks': len(subtasks), 'task categories': len(links)}
+
+
+def generate_books(rng, start, end):
+    plan = _plan
+    Book = apps.get_model('library', 'Book')
+    books, links = [], []
+    for offset in range(end - start):
+        pk = plan['book_base'] + start + offset
+        books.append(Book(
+            pk=pk, title=f'{rng.choice(NOUNS).capitalize()} {pk}',
+            author_id=plan['author_base'] + rng.randrange(plan['authors']),
+            publication_date=plan['now'].date() - timedelta(days=rng.randrange(365 * 80)),
+            genre=rng.choice(GENRES), amount_of_pages=rng.randint(40, 1200),
+            publisher_id=plan['publisher_base'] + rng.randrange(plan['publishers']),
+            category_id=rng.choice(plan['library_category_ids']),
+        ))
+        for library_id in rng.sample(plan['library_ids'], min(rng.randint(1, 3), len(plan['library_ids']))):
+            links.append(Book.libraries.through(book_id=pk, library_id=library_id))
+    Book.objects.bulk_create(books, batch_size=plan['batch_size'])
+    Book.libraries.through.objects.bulk_create(links, batch_size=plan['batch_size'])
+    return {'books': len(books), 'book libraries': len(links)}
+
+
+def generate_members(rng, start, end):
+    plan = _plan
+    Member = apps.get_model('library', 'Member')
+    today = plan['now'].date()
+    members, links = [], []
+    for offset in range(end - start):
+        pk = plan['member_base'] + start + offset
+        age = rng.randint(7, 90)
+        # bulk_create минует Member.save(), поэтому age заполняется здесь
+        members.append(Member(
+            pk=pk, first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            email=f'{plan["prefix"]}.member{pk}@example.com', gender=rng.choice('MF'),
+            birth_date=today.replace(year=today.year - age, month=1, day=1) + timedelta(days=rng.randrange(365)),
+            age=age, role=rng.choices('RAE', weights=(95, 1, 4))[0], active=rng.random() < 0.9,
+        ))
+        for library_id in rng.sample(plan['library_ids'], min(rng.randint(1, 2), len(plan['library_ids']))):
+            links.append(Member.libraries.through(member_id=pk, library_id=library_id))
+    Member.objects.bulk_create(members, batch_size=plan['batch_size'])
+    Member.libraries.through.objects.bulk_create(links, batch_size=plan['batch_size'])
+    return {'members': len(members), 'member libraries': len(links)}
+
+
+def generate_borrows(rng, start, end):
+    plan = _plan
+    Borrow = apps.get_model('library', 'Borrow')
+    today = plan['now'].date()
+    borrows = []
+    for _ in range(end - start):
+        borrow_date = today - timedelta(days=int(plan['days'] * rng.random() ** 2))
+        return_date = borrow_date + timedelta(days=rng.choice((7, 14, 21, 28)))
+        borrows.append(Borrow(
+            member_id=plan['member_base'] + rng.randrange(plan['members']),
+            book_id=plan['book_base'] + rng.randrange(plan['books']),
+            library_id=rng.choice(plan['library_ids']),
+            borrow_date=borrow_date, return_date=return_date,
+            # Просроченные, но не возвращённые — примерно каждая десятая
+            returned=return_date < today and rng.random() < 0.9,
+        ))
+    Borrow.objects.bulk_create(borrows, batch_size=plan['batch_size'])
+    return {'borrows': len(borrows)}
+
+
+GENERATORS = {
+    'tasks': generate_tasks,
+    'books': generate_books,
+    'members': generate_members,
+    'borrows': generate_borrows,
+}
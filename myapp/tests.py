@@ -1,3 +1,1411 @@
-from django.test import TestCase
+import csv
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import enterModuleContext, mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, FloatField, Max, Value, When
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core import checks
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from myapp import blacklist, export, metrics, schema, slowqueries, startup, stats, versions, warmup
+from myapp.authentication import CachedJWTAuthentication, ClaimsTokenObtainPairSerializer, token_cache, user_cache
+from myapp.categories import CategoryNameCache, category_names
+from myapp.log_handlers import BackgroundFileHandler
+from myapp.middleware import DBTimingMiddleware, LogRequestMiddleware
+from myapp.mixins import QueryBudgetExceeded
+from myapp.pagination import MyCursorPagination
+from myapp.models import Category, CategoryQuerySet, OwnerVersion, SubTask, Task, TaskStats, Tombstone
+from myapp.stats import get_task_stats
+from myapp.views import TaskBulkView, TaskListCreateView
+
+
+def setUpModule():
+    # Фоновый поток OutstandingBuffer писал бы из своего соединения мимо транзакции теста
+    enterModuleContext(override_settings(JWT_OUTSTANDING_FLUSH_INTERVAL=3600))
+
+
+class ValuesListSerializationTests(TestCase):
+    """Быстрый путь списков (FAST_LIST_SERIALIZATION) отдаёт те же байты, что и ModelSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        other = User.objects.create_user('bob', password='secret')
+        work, home, old = (Category.objects.create(name=name) for name in ('work', 'home', 'old'))
+        old.delete()  # мягко удалённая категория не попадает в ответ
+        deadline = timezone.now() + timedelta(days=3)
+        for i in range(7):
+            task = Task.objects.create(title=f'Task {i}', description='Описание "в кавычках"' if i % 2 else '',
+                                       status='Done' if i % 3 else 'New', deadline=deadline if i % 2 else None,
+                                       owner=cls.user)
+            if i % 2:
+                task.categories.add(home, old, work)
+            SubTask.objects.create(title=f'Sub {i}', task=task, owner=cls.user, deadline=deadline)
+        Task.objects.create(title='Foreign', owner=other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def assertSameBytes(self, url):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            actual = self.client.get(url)
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_task_list_pages(self):
+        self.assertSameBytes('/api/tasks/')
+        next_url = self.client.get('/api/tasks/').data['next']
+        self.assertSameBytes(next_url)
+        self.assertSameBytes('/api/tasks/?status=Done&ordering=created_at')
+
+    def test_my_tasks(self):
+        self.assertSameBytes('/api/tasks/my/')
+
+    def test_search_ordering(self):
+        self.assertSameBytes('/api/tasks/?search=task')
+
+    def test_subtask_list(self):
+        self.assertSameBytes('/api/subtasks/')
+
+
+class StartupTests(SimpleTestCase):
+    """Холодный старт воркера (manage.py profile_startup): отложенное не грузится в django.setup()."""
+
+    # Загружаются при первом обращении: документация, админка, JWT
+    LAZY_MODULES = {
+        'drf_yasg.views', 'drf_yasg.generators', 'myapp.admin', 'myapp.authentication',
+        'rest_framework_simplejwt.serializers',
+    }
+    SETUP_BUDGET = 3.0  # с, с большим запасом — ловит только грубые регрессии
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = startup.probe(importtime=False)
+
+    def test_lazy_modules_not_imported(self):
+        self.assertEqual(self.LAZY_MODULES & set(self.timings['setup_modules']), set())
+
+    def test_setup_time_budget(self):
+        self.assertLess(self.timings['setup'], self.SETUP_BUDGET)
+
+    def test_admin_checks_cover_lazy_admins(self):
+        # Системные проверки сами загружают admin.py — ошибки в них ловит manage.py check
+        site = admin.AdminSite(name='broken')
+        site.register(Tombstone, list_display=['nope'])
+        errors = checks.run_checks(tags=[checks.Tags.admin])
+        self.assertIn(Task, admin.site._registry)
+        self.assertEqual([error.id for error in errors], ['admin.E108'])
+
+
+class GenerateSyntheticDataTests(TestCase):
+    """manage.py generate_synthetic_data: строки, связи и пересчитанные счётчики."""
+
+    def test_generate(self):
+        call_command('generate_synthetic_data', users=5, tasks=300, categories=10, chunk_size=100,
+                     seed=1, workers=1, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='synthetic_').count(), 5)
+        self.assertEqual(Task.objects.count(), 300)
+        self.assertFalse(SubTask.objects.exclude(owner_id=F('task__owner_id')).exists())
+        self.assertEqual(TaskStats.objects.get(scope=TaskStats.GLOBAL_SCOPE).total, 300)
+        self.assertEqual(sum(Category.objects.values_list('task_count', flat=True)),
+                         Task.categories.through.objects.count())
+
+
+class TaskStatsTests(TestCase):
+    """TaskStats поддерживается сигналами и совпадает с пересчётом по таблице Task."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.other = User.objects.create_user('bob', password='secret')
+
+    def assertCountersFresh(self):
+        fresh = stats.compute_counters()
+        for scope, counters in fresh.items():
+            row = TaskStats.objects.get(scope=scope)
+            self.assertEqual({field: getattr(row, field) for field in stats.COUNTER_FIELDS},
+                             {field: counters[field] for field in stats.COUNTER_FIELDS}, scope)
+
+    def test_counters_follow_changes(self):
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        task = Task.objects.create(title='a', owner=self.user, status='New', deadline=past)
+        Task.objects.create(title='b', owner=self.user, status='Done', deadline=past)
+        Task.objects.create(title='c', owner=self.other, status='Pending', deadline=future)
+        self.assertCountersFresh()
+        self.assertEqual(get_task_stats().as_dict(), {
+            'total_tasks': 3, 'status_counts': {'New': 1, 'Pending': 1, 'Done': 1}, 'overdue_tasks': 1})
+
+        task.status = 'In progress'
+        task.save()
+        task = Task.objects.get(pk=task.pk)
+        task.owner = self.other
+        task.save(update_fields=['owner'])
+        self.assertCountersFresh()
+
+        self.assertEqual(Task.objects.filter(owner=self.other).update_status('Done'), 2)
+        self.assertCountersFresh()
+        self.assertEqual(get_task_stats(self.other.pk).status_done, 2)
+
+        Task.objects.filter(owner=self.user).delete()
+        self.assertCountersFresh()
+        self.assertEqual(get_task_stats().total, 2)
+
+    def test_overdue_recomputed_after_deadline(self):
+        deadline = timezone.now() + timedelta(hours=1)
+        Task.objects.create(title='a', owner=self.user, status='New', deadline=deadline)
+        self.assertEqual(get_task_stats().overdue, 0)
+        self.assertEqual(TaskStats.objects.get(scope=TaskStats.GLOBAL_SCOPE).overdue_valid_until, deadline)
+        with mock.patch('myapp.stats.timezone.now', return_value=deadline + timedelta(seconds=1)):
+            self.assertEqual(get_task_stats().overdue, 1)
+            self.assertEqual(get_task_stats(self.user.pk).overdue, 1)
+
+    def test_view(self):
+        Task.objects.create(title='a', owner=self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/tasks/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'total_tasks': 1, 'status_counts': {'New': 1}, 'overdue_tasks': 0})
+
+    def test_rebuild_command(self):
+        Task.objects.create(title='a', owner=self.user)
+        call_command('rebuild_task_stats', '--check', stdout=StringIO())
+        TaskStats.objects.filter(scope=self.user.pk).update(total=5, status_new=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_stats', '--check', stdout=StringIO())
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertCountersFresh()
+
+
+@override_settings(QUERY_BUDGET_MODE='raise', FAST_LIST_SERIALIZATION=False)
+class QueryBudgetTests(TestCase):
+    """Число запросов списков и карточки задачи не растёт с числом строк (нет N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        work, home = Category.objects.create(name='work'), Category.objects.create(name='home')
+        for i in range(6):
+            task = Task.objects.create(title=f'Task {i}', owner=cls.user)
+            task.categories.add(work, home)
+            for j in range(3):
+                SubTask.objects.create(title=f'Sub {i}.{j}', task=task, owner=cls.user)
+        cls.task = task
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_reads_within_budget(self):
+        for url in ('/api/tasks/', '/api/tasks/my/', f'/api/tasks/{self.task.pk}/', '/api/subtasks/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_exceeded_budget_raises(self):
+        with mock.patch.object(TaskListCreateView, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/tasks/')
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset-курсор: полный обход вперёд и назад без дублей и пропусков, в том числе по NULL и равным значениям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        now = timezone.now()
+        for i in range(13):
+            Task.objects.create(title=f'Report {i}' if i % 3 else 'Report', owner=cls.user,
+                                deadline=None if i % 4 == 0 else now + timedelta(days=i % 3))
+
+    def walk(self, queryset, ordering):
+        paginator = MyCursorPagination()
+        paginator.ordering = ordering
+        factory = APIRequestFactory()
+        url, pages = '/', []
+        while url:
+            page = paginator.paginate_queryset(queryset, Request(factory.get(url)))
+            pages.append([row.pk for row in page])
+            url = paginator.get_next_link()
+        forward = [pk for page in pages for pk in page]
+        # Обратно по ссылкам previous с последней страницы
+        backward, url = [], paginator.get_previous_link()
+        while url:
+            page = paginator.paginate_queryset(queryset, Request(factory.get(url)))
+            backward = [row.pk for row in page] + backward
+            url = paginator.get_previous_link()
+        self.assertEqual(backward + pages[-1], forward)
+        return forward
+
+    def assertWalk(self, queryset, ordering, key):
+        forward = self.walk(queryset, ordering)
+        expected = sorted(queryset, key=key)
+        self.assertEqual(forward, [row.pk for row in expected])
+
+    def test_nullable_deadline(self):
+        queryset = Task.objects.all()
+        self.assertWalk(queryset, ('deadline',), key=lambda t: (t.deadline is not None, t.deadline or 0, t.pk))
+        self.assertWalk(queryset, ('-deadline',), key=lambda t: (t.deadline is None, -(t.deadline.timestamp() if t.deadline else 0), -t.pk))
+
+    def test_float_rank_with_ties_and_nulls(self):
+        # Как search_rank: float-аннотация с равными значениями и NULL
+        rank = Case(When(pk__in=Task.objects.order_by('pk').values('pk')[:4], then=None),
+                    When(title='Report', then=Value(0.1 + 0.2)), default=Value(1 / 3), output_field=FloatField())
+        queryset = Task.objects.annotate(search_rank=rank)
+        self.assertWalk(queryset, ('-search_rank', '-id'),
+                        key=lambda t: (t.search_rank is None, -(t.search_rank or 0), -t.pk))
+        self.assertWalk(queryset, ('search_rank', 'id'),
+                        key=lambda t: (t.search_rank is not None, t.search_rank or 0, t.pk))
+
+    def test_search_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url, seen = '/api/tasks/?search=report', []
+        while url:
+            response = client.get(url)
+            seen += [task['id'] for task in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(Task.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+
+class FullTextSearchTests(TestCase):
+    """?search= по полнотекстовому индексу: префиксы, все слова обязательны, ранжирование, синхронизация индекса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        other = User.objects.create_user('bob', password='secret')
+        cls.in_title = Task.objects.create(title='Quarterly budget', description='numbers', owner=cls.user)
+        cls.in_description = Task.objects.create(title='Meeting', description='talk about the budget', owner=cls.user)
+        cls.unrelated = Task.objects.create(title='Backup', description='server', owner=cls.user)
+        Task.objects.create(title='Budget of bob', owner=other)
+        SubTask.objects.create(title='Budget table', task=cls.unrelated, owner=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, url='/api/tasks/'):
+        response = self.client.get(url, {'search': query, 'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_ranked_prefix_search(self):
+        # Совпадение в title весит больше, чем в description; чужие задачи не видны
+        self.assertEqual(self.search('budg'), [self.in_title.pk, self.in_description.pk])
+        self.assertEqual(self.search('budget talk'), [self.in_description.pk])
+        self.assertEqual(self.search('missing'), [])
+        self.assertEqual(len(self.search('budget', '/api/subtasks/')), 1)
+
+    def test_explicit_ordering_wins(self):
+        response = self.client.get('/api/tasks/', {'search': 'budget', 'ordering': '-created_at'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.in_description.pk, self.in_title.pk])
+
+    def test_index_follows_changes(self):
+        self.unrelated.title = 'Budget backup'
+        self.unrelated.save()
+        self.in_title.delete()
+        self.assertEqual(sorted(self.search('budget')), sorted([self.in_description.pk, self.unrelated.pk]))
+
+    def test_fallback_without_index(self):
+        with mock.patch('myapp.search.is_supported', return_value=False):
+            self.assertEqual(sorted(self.search('udge')), sorted([self.in_title.pk, self.in_description.pk]))
+
+
+class BulkWriteTests(TestCase):
+    """tasks/bulk/ и subtasks/bulk/: результат по каждому элементу, 207 при частичных ошибках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.other = User.objects.create_user('bob', password='secret')
+        cls.work = Category.objects.create(name='work')
+        cls.foreign = Task.objects.create(title='Foreign', owner=cls.other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_create(self):
+        response = self.client.post('/api/tasks/bulk/', [
+            {'title': 'a', 'categories': ['work']}, {'title': 'b', 'status': 'Done'}], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.statuses(response), [201, 201])
+        task = Task.objects.get(pk=response.data['results'][0]['id'])
+        self.assertEqual(task.owner, self.user)
+        self.assertEqual(list(task.categories.values_list('name', flat=True)), ['work'])
+        self.assertEqual(Category.objects.get(pk=self.work.pk).task_count, 1)
+        self.assertEqual(get_task_stats(self.user.pk).as_dict()['status_counts'], {'New': 1, 'Done': 1})
+        self.assertGreater(task.sync_version, 0)
+
+    def test_create_partial_failure(self):
+        response = self.client.post('/api/tasks/bulk/', [
+            {'title': 'ok'}, {'title': 'bad', 'status': 'Nope'}, {'title': 'c', 'categories': ['missing']}],
+            format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [201, 400, 400])
+        self.assertIn('status', response.data['results'][1]['errors'])
+        self.assertIn('categories', response.data['results'][2]['errors'])
+        self.assertEqual(list(Task.objects.filter(owner=self.user).values_list('title', flat=True)), ['ok'])
+
+    def test_update_partial_failure(self):
+        own = Task.objects.create(title='Own', owner=self.user)
+        response = self.client.patch('/api/tasks/bulk/', [
+            {'id': own.pk, 'status': 'Done', 'categories': ['work']}, {'id': self.foreign.pk, 'title': 'x'},
+            {'title': 'no id'}], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [200, 404, 400])
+        own.refresh_from_db()
+        self.assertEqual(own.status, 'Done')
+        self.assertEqual(Task.objects.get(pk=self.foreign.pk).title, 'Foreign')
+        self.assertEqual(get_task_stats(self.user.pk).status_done, 1)
+
+    def test_delete(self):
+        own = Task.objects.create(title='Own', owner=self.user)
+        response = self.client.delete('/api/tasks/bulk/', [own.pk, self.foreign.pk, 'x'], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [204, 404, 400])
+        self.assertFalse(Task.objects.filter(pk=own.pk).exists())
+        self.assertTrue(Task.objects.filter(pk=self.foreign.pk).exists())
+
+    def test_subtasks(self):
+        own = Task.objects.create(title='Own', owner=self.user)
+        response = self.client.post('/api/subtasks/bulk/', [
+            {'title': 's', 'task': own.pk}, {'title': 's', 'task': 10 ** 6}], format='json')
+        self.assertEqual(self.statuses(response), [201, 400])
+        self.assertEqual(own.subtasks.count(), 1)
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_limits(self):
+        self.assertEqual(self.client.post('/api/tasks/bulk/', [{'title': 'a'}] * 3, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/tasks/bulk/', {'title': 'a'}, format='json').status_code, 400)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    """tasks/export/ и subtasks/export/: все строки владельца потоком, NDJSON и CSV."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        work, home = Category.objects.create(name='work'), Category.objects.create(name='home')
+        for i in range(5):
+            task = Task.objects.create(title=f'Task "{i}"', description='строка\nвторая', owner=cls.user)
+            task.categories.add(work, home)
+            SubTask.objects.create(title=f'Sub {i}', task=task, owner=cls.user)
+        Task.objects.create(title='Foreign', owner=User.objects.create_user('bob'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.client.get('/api/tasks/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows], [f'Task "{i}"' for i in range(5)])
+        self.assertEqual(rows[0]['categories'], ['work', 'home'])
+        self.assertEqual(rows[0]['description'], 'строка\nвторая')
+
+    def test_csv(self):
+        response = self.client.get('/api/tasks/export/?format=csv')
+        self.assertIn('filename="tasks.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(self.content(response))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['categories'], 'work, home')
+        self.assertEqual(rows[0]['title'], 'Task "0"')
+
+    def test_subtasks(self):
+        self.assertEqual(len(self.content(self.client.get('/api/subtasks/export/')).splitlines()), 5)
+
+    def test_keyset_batches(self):
+        # Путь MySQL: пачки по pk > последний
+        with mock.patch.object(export.connection, 'vendor', 'mysql'):
+            rows = list(export.iterate(Task.objects.filter(owner=self.user), chunk_size=2))
+        self.assertEqual([task.pk for task in rows], list(Task.objects.filter(owner=self.user).order_by('pk')
+                                                          .values_list('pk', flat=True)))
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/tasks/export/').status_code, 401)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    async def test_asgi_streams_batches(self):
+        token = await sync_to_async(lambda: RefreshToken.for_user(self.user).access_token)()
+        response = await AsyncClient().get('/api/tasks/export/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # По пачке в 2 строки, а не весь ответ одним куском
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 2, 1])
+        rows = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], [f'Task "{i}"' for i in range(5)])
+
+
+class ConditionalGetTests(TestCase):
+    """ETag по версии владельца: 304 без запросов к задачам, любое изменение данных меняет ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('alex', password='secret')
+        cls.other = User.objects.create_user('bob', password='secret')
+        cls.task = Task.objects.create(title='Task', owner=cls.user)
+        cls.subtask = SubTask.objects.create(title='Sub', task=cls.task, owner=cls.user)
+        cls.foreign = Task.objects.create(title='Foreign', owner=cls.other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def etag(self, url='/api/tasks/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified(self):
+        for url in ('/api/tasks/', f'/api/tasks/{self.task.pk}/', '/api/tasks/my/'):
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with self.assertNumQueries(1):  # только OwnerVersion
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.etag('/api/tasks/'), self.etag('/api/tasks/?status=Done'))
+
+    def test_detail_version_is_one_join(self):
+        etag = self.etag(f'/api/tasks/{self.task.pk}/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH=etag)
+        sql = queries[0]['sql']
+        self.assertEqual(sql.count('JOIN'), 1)
+        self.assertNotIn('auth_user', sql)
+        self.assertEqual(versions.get_version_by_task(self.foreign.pk),
+                         (self.other.pk, versions.get_version(self.other.pk)))
+        # Владелец без строки OwnerVersion — версия 0
+        OwnerVersion.objects.filter(owner=self.other).delete()
+        self.assertEqual(versions.get_version_by_task(self.foreign.pk), (self.other.pk, (0, None)))
+        self.assertEqual(versions.get_version_by_task(0), (None, (0, None)))
+
+    def test_changes_update_etag(self):
+        etag = self.etag()
+        Task.objects.filter(pk=self.foreign.pk).update_status('Done')
+        self.assertEqual(self.etag(), etag)  # чужие изменения не в счёт
+
+        changes = [
+            lambda: Task.objects.create(title='New', owner=self.user),
+            lambda: SubTask.objects.filter(pk=self.subtask.pk).update_status('Done'),
+            lambda: self.task.categories.add(Category.objects.create(name='work')),
+            lambda: Category.objects.filter(name='work').get().delete(),
+            lambda: Task.objects.filter(pk=self.task.pk).update_status('Pending'),
+        ]
+        for change in changes:
+            change()
+            new_etag = self.etag()
+            self.assertNotEqual(new_etag, etag)
+            etag = new_etag
+
+    def test_admin_subtask_action_is_stamped(self):
+        since = self.client.get('/api/changes/').data['next']
+        etag = self.etag()
+        admin_client = Client()
+        admin_client.force_login(self.user)
+        response = admin_client.post('/admin/myapp/subtask/', {
+            'action': 'mark_as_done', '_selected_action': [self.subtask.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SubTask.objects.get(pk=self.subtask.pk).status, 'Done')
+        self.assertNotEqual(self.etag(), etag)
+        changes = self.client.get('/api/changes/', {'since': since}).data['changes']
+        self.assertEqual([(change['kind'], change['id']) for change in changes], [('subtask', self.subtask.pk)])
+
+
+class ChangesFeedTests(TestCase):
+    """changes/?since=: изменения и удаления по порядку версий, надгробия, истечение токенов после purge_tombstones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        User.objects.create_user('bob').tasks.create(title='Foreign')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def feed(self, since=None, limit=100):
+        params = {'limit': limit}
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/changes/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def read_all(self, since=None, limit=2):
+        changes = []
+        while True:
+            data = self.feed(since, limit)
+            changes += [(change['kind'], change['op'], change['id']) for change in data['changes']]
+            since = data['next']
+            if not data['has_more']:
+                return changes, since
+
+    def test_full_and_incremental(self):
+        since = self.feed()['next']  # данных ещё нет
+        task = Task.objects.create(title='a', owner=self.user)
+        subtask = SubTask.objects.create(title='s', task=task, owner=self.user)
+        other = Task.objects.create(title='b', owner=self.user)
+        changes, since = self.read_all(since)
+        self.assertEqual(changes, [('task', 'upsert', task.pk), ('subtask', 'upsert', subtask.pk),
+                                   ('task', 'upsert', other.pk)])
+        self.assertEqual(self.feed(since)['changes'], [])
+
+        task.title = 'a2'
+        task.save()
+        other_pk = other.pk
+        other.delete()
+        changes, since = self.read_all(since)
+        self.assertEqual(changes, [('task', 'upsert', task.pk), ('task', 'delete', other_pk)])
+        self.assertEqual(self.read_all()[0], [('subtask', 'upsert', subtask.pk), ('task', 'upsert', task.pk),
+                                              ('task', 'delete', other_pk)])
+
+    def purge(self):
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+        call_command('purge_tombstones', '--batch-size', '1', stdout=StringIO())
+
+    def test_token_expires_after_purge(self):
+        tasks = [Task.objects.create(title=str(i), owner=self.user) for i in range(3)]
+        before = self.feed()['next']
+        # Два надгробия с одной версией; страница кончается между ними — позиция на версии будущего порога
+        Task.objects.filter(pk__in=[tasks[0].pk, tasks[1].pk]).delete()
+        at_floor = self.feed(before, limit=1)['next']
+        self.purge()
+        self.assertFalse(Tombstone.objects.exists())
+        for token in (before, at_floor):
+            self.assertEqual(self.client.get('/api/changes/', {'since': token}).status_code, 410)
+
+        # Полная синхронизация после purge проходит страницами и по версиям ниже порога
+        changes, since = self.read_all(limit=1)
+        self.assertEqual(changes, [('task', 'upsert', tasks[2].pk)])
+        last_pk = tasks[2].pk
+        tasks[2].delete()
+        self.assertEqual(self.read_all(since)[0], [('task', 'delete', last_pk)])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/changes/', {'since': 'garbage'}).status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= / ?omit=: только запрошенные поля в ответе и в SQL, на обоих путях сериализации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        work = Category.objects.create(name='work')
+        for i in range(7):
+            Task.objects.create(title=f'Task {i}', description='long text', owner=cls.user).categories.add(work)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_fields(self):
+        for fast in (False, True):
+            with self.subTest(fast=fast), override_settings(FAST_LIST_SERIALIZATION=fast):
+                response, queries = self.get('/api/tasks/?fields=id,title')
+                self.assertEqual([set(row) for row in response.data['results']], [{'id', 'title'}] * 5)
+                task_queries = [sql for sql in queries if 'FROM "myapp_task"' in sql]
+                self.assertEqual(len(task_queries), 1)  # без категорий
+                self.assertNotIn('"description"', task_queries[0])
+                # Курсор следующей страницы строится по полям сортировки, которых нет в ответе
+                response, _ = self.get(response.data['next'])
+                self.assertEqual(len(response.data['results']), 2)
+
+    def test_omit(self):
+        response, queries = self.get('/api/tasks/?omit=description,categories')
+        self.assertEqual(set(response.data['results'][0]),
+                         {'id', 'title', 'status', 'deadline', 'created_at', 'owner'})
+        self.assertFalse([sql for sql in queries if 'myapp_task_categories' in sql])
+
+    def test_detail_and_writes(self):
+        task = Task.objects.filter(owner=self.user).first()
+        self.assertEqual(set(self.client.get(f'/api/tasks/{task.pk}/?fields=title').data), {'title'})
+        response = self.client.post('/api/tasks/?fields=id', {'title': 'new'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('description', response.data)
+
+
+class CategoryUpsertTests(TestCase):
+    """upsert_names и POST categories/: существующие имена не дублируются, удалённые восстанавливаются."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.work = Category.objects.create(name='work')
+        cls.task = Task.objects.create(title='Task', owner=cls.user)
+        cls.task.categories.add(cls.work)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upsert_names(self):
+        Category.objects.create(name='old').delete()
+        categories = Category.objects.upsert_names(['new', 'work', 'old', 'new'])
+        self.assertEqual([(c.name, c.created) for c in categories], [('new', True), ('work', False), ('old', False)])
+        self.assertEqual(categories[1].pk, self.work.pk)
+        self.assertEqual(Category.objects.filter(name__in=['new', 'work', 'old']).count(), 3)
+
+    def test_upsert_without_returning(self):
+        # MySQL: INSERT IGNORE без RETURNING — новые строки те, чей id не меньше первого выданного
+        def insert_ignore(queryset, names):
+            first_id = (Category.all_objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+            Category.all_objects.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+            return [], first_id if Category.all_objects.filter(pk__gte=first_id).exists() else None
+
+        with mock.patch.object(CategoryQuerySet, '_insert_names', insert_ignore):
+            categories = Category.objects.upsert_names(['work', 'home'])
+            self.assertEqual([(c.pk, c.created, c.task_count) for c in categories],
+                             [(self.work.pk, False, 1), (Category.objects.get(name='home').pk, True, 0)])
+            self.assertEqual([c.created for c in Category.objects.upsert_names(['home'])], [False])
+
+    def test_post(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/categories/', {'name': 'home'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'id': Category.objects.get(name='home').pk, 'name': 'home', 'task_count': 0})
+        # Новое имя — только вставка с RETURNING
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']],
+                         ['INSERT'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/categories/', {'name': 'work'}, format='json')
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']],
+                         ['INSERT', 'SELECT'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': self.work.pk, 'name': 'work', 'task_count': 1})
+
+    def test_post_revives_deleted(self):
+        self.work.delete()
+        etag = self.client.get('/api/tasks/')['ETag']
+        response = self.client.post('/api/categories/', {'name': 'work'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Category.objects.filter(pk=self.work.pk).exists())
+        self.assertNotEqual(self.client.get('/api/tasks/')['ETag'], etag)
+
+
+class CategoryTaskCountTests(TestCase):
+    """Category.task_count следует за связями задач со всех сторон и не уходит в минус."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.work, cls.home = Category.objects.create(name='work'), Category.objects.create(name='home')
+
+    def counts(self):
+        return dict(Category.all_objects.values_list('name', 'task_count'))
+
+    def test_links(self):
+        first, second = (Task.objects.create(title=str(i), owner=self.user) for i in range(2))
+        first.categories.add(self.work, self.home)
+        first.categories.add(self.work)  # уже есть — не считается
+        self.work.task.add(second)
+        self.assertEqual(self.counts(), {'work': 2, 'home': 1})
+
+        first.categories.remove(self.work)
+        self.assertEqual(self.counts(), {'work': 1, 'home': 1})
+        first.categories.set([self.work])
+        self.assertEqual(self.counts(), {'work': 2, 'home': 0})
+        self.work.task.clear()
+        self.assertEqual(self.counts(), {'work': 0, 'home': 0})
+
+        first.categories.add(self.work, self.home)
+        second.categories.add(self.work)
+        first.delete()
+        self.assertEqual(self.counts(), {'work': 1, 'home': 0})
+        Task.objects.all().delete()
+        self.assertEqual(self.counts(), {'work': 0, 'home': 0})
+
+    def test_drift_is_clamped(self):
+        task = Task.objects.create(title='t', owner=self.user)
+        task.categories.add(self.work)
+        Category.all_objects.filter(pk=self.work.pk).update(task_count=0)
+        with CaptureQueriesContext(connection) as queries:
+            task.categories.remove(self.work)
+        self.assertIn('CASE WHEN', ' '.join(query['sql'] for query in queries))
+        self.assertEqual(self.counts()['work'], 0)
+
+        Category.all_objects.filter(pk=self.work.pk).update(task_count=7)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_category_counts', '--check', stdout=StringIO())
+        call_command('reconcile_category_counts', stdout=StringIO())
+        self.assertEqual(self.counts()['work'], 0)
+
+
+class MetricsFileStoreTests(SimpleTestCase):
+    """Снимки завершившихся процессов удаляются из METRICS_DIR при чтении."""
+
+    def test_dead_pid_files_are_pruned(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        dead = os.path.join(directory, f'{process.pid}-1.json')
+        with open(dead, 'w') as file:
+            json.dump({'help': {}, 'counters': [['http_requests_total', [], 5]], 'histograms': []}, file)
+
+        store = metrics.FileStore(directory)
+        store.write({'help': {}, 'counters': [['http_requests_total', [], 2]], 'histograms': []})
+        output = metrics.render(store.read_all())
+        self.assertIn('http_requests_total 2\n', output)
+        self.assertFalse(os.path.exists(dead))
+        self.assertTrue(os.path.exists(store.path))
+
+
+class MetricsViewTests(SimpleTestCase):
+    """/metrics закрыт без токена, пока его явно не открыли METRICS_PUBLIC."""
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=False)
+    def test_closed_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=True)
+    def test_public_opt_out(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    @override_settings(METRICS_TOKEN='s3cret', METRICS_PUBLIC=True)
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+
+
+class DBTimingMiddlewareTests(TestCase):
+    """Server-Timing с числом SQL-запросов и в WSGI-, и в ASGI-цепочке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        Task.objects.create(title='t', owner=cls.user)
+
+    def setUp(self):
+        self.auth = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+
+    def test_sync(self):
+        response = Client().get('/api/tasks/', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    async def test_async(self):
+        # Асинхронный путь: счётчик стоит на соединении потока, где выполняется view
+        with mock.patch.object(DBTimingMiddleware, '__acall__', autospec=True,
+                               side_effect=DBTimingMiddleware.__acall__) as acall:
+            response = await AsyncClient().get('/api/tasks/', headers={'Authorization': self.auth})
+        acall.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class SlowQueryLoggerTests(TestCase):
+    """Отпечаток SQL, порог SLOW_QUERY_MS, выборка остальных запросов и EXPLAIN только для медленных SELECT."""
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            slowqueries.fingerprint("SELECT * FROM t WHERE name = 'O''Brien' AND id = 42 AND x > 1.5"),
+            'SELECT * FROM t WHERE name = ? AND id = ? AND x > ?',
+        )
+        self.assertEqual(
+            slowqueries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s,  %s) AND  x = %s'),
+            'SELECT * FROM t WHERE id IN (...) AND x = %s',
+        )
+        self.assertEqual(
+            slowqueries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            slowqueries.fingerprint('SELECT * FROM t WHERE id IN (?, ?, ?, ?)'),
+        )
+        self.assertEqual(
+            slowqueries.fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...), ...',
+        )
+
+    def run_query(self, logger, sql, duration_ms, many=False):
+        # perf_counter до и после execute — запрос «длится» duration_ms
+        with mock.patch('myapp.slowqueries.time.perf_counter', side_effect=[0, duration_ms / 1000]):
+            with connection.cursor() as cursor:
+                return logger(lambda *args: None, sql, (), many, {'connection': connection, 'cursor': cursor})
+
+    @override_settings(SLOW_QUERY_MS=100, SLOW_QUERY_SAMPLE_RATE=0.0)
+    def test_threshold(self):
+        logger = slowqueries.SlowQueryLogger()
+        with self.assertNoLogs('myapp.slow_queries'):
+            self.run_query(logger, 'SELECT 1', 99)
+        with self.assertLogs('myapp.slow_queries') as logs:
+            self.run_query(logger, 'SELECT 2', 150)
+        record, = logs.records
+        self.assertTrue(record.slow)
+        self.assertEqual((record.sql, record.duration_ms, record.seen), ('SELECT ?', 150, 1))
+        self.assertIsNone(record.plan)
+        self.assertEqual([row[1:4] for row in logger.stats()], [(1, 150, 150)])
+
+    @override_settings(SLOW_QUERY_MS=100, SLOW_QUERY_SAMPLE_RATE=0.5)
+    def test_sampling(self):
+        logger = slowqueries.SlowQueryLogger()
+        with mock.patch('myapp.slowqueries.random.random', return_value=0.7), \
+                self.assertNoLogs('myapp.slow_queries'):
+            self.run_query(logger, 'SELECT 1', 10)
+        with mock.patch('myapp.slowqueries.random.random', return_value=0.3), \
+                self.assertLogs('myapp.slow_queries') as logs:
+            self.run_query(logger, 'SELECT 1', 10)
+        self.assertFalse(logs.records[0].slow)
+
+    @override_settings(SLOW_QUERY_MS=100, SLOW_QUERY_EXPLAIN=True)
+    def test_explain_only_slow_select(self):
+        logger = slowqueries.SlowQueryLogger()
+        table = Task._meta.db_table
+        with self.assertLogs('myapp.slow_queries') as logs:
+            self.run_query(logger, f'SELECT * FROM {table} WHERE id = 1', 150)
+            self.run_query(logger, f'UPDATE {table} SET title = title WHERE id = 1', 150)
+            self.run_query(logger, f'SELECT * FROM {table} WHERE id = 1', 150, many=True)
+        select, update, many = logs.records
+        self.assertTrue(select.plan)
+        self.assertIsNone(update.plan)
+        self.assertIsNone(many.plan)
+        with override_settings(SLOW_QUERY_EXPLAIN=False), self.assertLogs('myapp.slow_queries') as logs:
+            self.run_query(logger, f'SELECT * FROM {table} WHERE id = 1', 150)
+        self.assertIsNone(logs.records[0].plan)
+
+    @override_settings(SLOW_QUERY_MS=None, SLOW_QUERY_SAMPLE_RATE=1.0)
+    def test_disabled(self):
+        logger = slowqueries.SlowQueryLogger()
+        with self.assertNoLogs('myapp.slow_queries'):
+            self.run_query(logger, 'SELECT 1', 1000)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Кэш проверенных токенов и пользователей, сброс пользователя при сохранении, пользователь из claims."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret', is_staff=True)
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.addCleanup(user_cache.clear)
+        # Внутри транзакции теста UserCache ничего не кэширует
+        patcher = mock.patch('myapp.authentication.connection')
+        patcher.start().in_atomic_block = False
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_token_and_user_are_cached(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        with mock.patch('rest_framework_simplejwt.authentication.JWTAuthentication.get_validated_token') as validate, \
+                self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        validate.assert_not_called()
+
+    def test_invalid_token_is_not_cached(self):
+        token = str(RefreshToken.for_user(self.user).access_token)[:-2] + 'xx'
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                self.authenticate(token)
+        self.assertIsNone(token_cache.get(token.encode()))
+
+    def test_user_is_invalidated_on_save(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.authenticate(token)
+        self.user.first_name = 'Alex'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).first_name, 'Alex')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.is_active = False
+        user_cache.set(self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    @override_settings(JWT_USER_FROM_CLAIMS=True)
+    def test_user_from_claims(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertEqual((user.pk, user.username, user.is_staff, user.is_superuser),
+                         (self.user.pk, 'alex', True, False))
+        self.assertTrue(user.is_authenticated)
+
+        # Токен без claims — как раньше, из БД
+        token = RefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+
+class TokenBlacklistTests(TestCase):
+    """Отзыв refresh-токенов при выходе и ротации, проверка через фильтр Блума, запись OutstandingToken."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+
+    def setUp(self):
+        blacklist.blacklist_filter.reset()
+        self.addCleanup(blacklist.blacklist_filter.reset)
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/token/', {'username': 'alex', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+
+    def refresh_token(self, refresh):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/token/refresh/', {'refresh': refresh})
+
+    def test_logout_blacklists_refresh_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/logout/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+        # Другой процесс узнаёт об отзыве из БД, а не из своего фильтра
+        blacklist.blacklist_filter.reset()
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+    def test_rotation_blacklists_old_token(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(response.data['refresh']).status_code, 200)
+
+    def test_unrevoked_token_is_checked_without_queries(self):
+        blacklist.RefreshToken(self.refresh).check_blacklist()  # строит фильтр
+        with self.assertNumQueries(0):
+            blacklist.RefreshToken(self.refresh).check_blacklist()
+
+    def test_stale_filter_falls_back_to_database(self):
+        token = blacklist.RefreshToken(self.refresh)
+        jti = token['jti']
+        worker, other = blacklist.BlacklistFilter(), blacklist.BlacklistFilter()
+        worker.might_contain(jti)
+        self.assertFalse(other.might_contain(jti))
+        with mock.patch('myapp.blacklist.blacklist_filter', worker), self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        self.assertTrue(worker.might_contain(jti))
+
+        # Подгрузка в другом процессе не удалась — его фильтр устарел, и ответ даёт БД
+        later = time.monotonic() + settings.JWT_BLACKLIST_SYNC_INTERVAL + 1
+        with mock.patch('myapp.blacklist.time.monotonic', return_value=later), \
+                mock.patch.object(other, '_load', side_effect=DatabaseError), \
+                mock.patch('myapp.blacklist.blacklist_filter', other), \
+                self.assertLogs('myapp.blacklist', 'ERROR'):
+            self.assertTrue(other.might_contain(jti))
+            with self.assertRaises(TokenError):
+                blacklist.RefreshToken(self.refresh)
+        # Следующая успешная подгрузка приносит отзыв в фильтр
+        with mock.patch('myapp.blacklist.time.monotonic', return_value=later + 1):
+            self.assertTrue(other.might_contain(jti))
+
+    def test_outstanding_buffer_flushes_by_time(self):
+        buffer = blacklist.OutstandingBuffer()
+        with mock.patch('myapp.blacklist.threading.Thread') as thread:
+            buffer.add(blacklist.RefreshToken(self.refresh))
+            buffer.add(RefreshToken())
+        thread.assert_called_once()  # один фоновый поток на процесс
+
+        jti = buffer._pending[0].jti
+        buffer.flush_expired()
+        self.assertFalse(OutstandingToken.objects.filter(jti=jti).exists())
+        later = time.monotonic() + settings.JWT_OUTSTANDING_FLUSH_INTERVAL + 1
+        with mock.patch('myapp.blacklist.time.monotonic', return_value=later):
+            buffer.flush_expired()
+        self.assertTrue(OutstandingToken.objects.filter(jti=jti).exists())
+        self.assertEqual(buffer._pending, [])
+
+
+class OwnerScopingTests(TestCase):
+    """Чужие задачи и подзадачи: читать можно, изменение и удаление — 404, без утечки существования."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.other = User.objects.create_user('bob', password='secret')
+        cls.own = Task.objects.create(title='Own', owner=cls.user)
+        cls.foreign = Task.objects.create(title='Foreign', owner=cls.other)
+        cls.own_sub = SubTask.objects.create(title='Own sub', task=cls.own, owner=cls.user)
+        cls.foreign_sub = SubTask.objects.create(title='Foreign sub', task=cls.foreign, owner=cls.other)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_foreign_objects(self):
+        for url, obj in ((f'/api/tasks/{self.foreign.pk}/', self.foreign),
+                         (f'/api/subtasks/{self.foreign_sub.pk}/', self.foreign_sub)):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertEqual(self.client.patch(url, {'title': 'x'}, format='json').status_code, 404)
+                self.assertEqual(self.client.put(url, {'title': 'x'}, format='json').status_code, 404)
+                self.assertEqual(self.client.delete(url).status_code, 404)
+                obj.refresh_from_db()
+                self.assertNotEqual(obj.title, 'x')
+        # Чужой и несуществующий объект неразличимы
+        missing = self.client.patch('/api/tasks/999999/', {'title': 'x'}, format='json')
+        foreign = self.client.patch(f'/api/tasks/{self.foreign.pk}/', {'title': 'x'}, format='json')
+        self.assertEqual((missing.status_code, missing.data), (foreign.status_code, foreign.data))
+
+    def test_owner_can_write(self):
+        response = self.client.patch(f'/api/tasks/{self.own.pk}/', {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=self.own.pk).title, 'Renamed')
+        response = self.client.patch(f'/api/subtasks/{self.own_sub.pk}/', {'title': 'Renamed sub'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/subtasks/{self.own_sub.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/tasks/{self.own.pk}/').status_code, 204)
+
+    def test_owner_check_is_part_of_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(f'/api/tasks/{self.foreign.pk}/')
+        lookups = [query['sql'] for query in queries if 'FROM "myapp_task"' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn('owner_id', lookups[0])
+
+    def test_bulk_on_foreign_ids(self):
+        response = self.client.patch('/api/subtasks/bulk/', [{'id': self.foreign_sub.pk, 'title': 'x'}],
+                                     format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [404])
+        self.assertEqual(SubTask.objects.get(pk=self.foreign_sub.pk).title, 'Foreign sub')
+
+
+@override_settings(OPENAPI_SCHEMA_DIR='')
+class SchemaDocumentTests(TestCase):
+    """Схема строится один раз на процесс; страницы Swagger UI и ReDoc генератор не вызывают."""
+
+    def setUp(self):
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def test_generated_once(self):
+        from drf_yasg.generators import OpenAPISchemaGenerator
+
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True,
+                               side_effect=OpenAPISchemaGenerator.get_schema) as get_schema:
+            for url in ('/swagger/', '/redoc/', '/swagger/', '/redoc/'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, '"/swagger.json"')
+            get_schema.assert_not_called()
+
+            first = self.client.get('/swagger.json')
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(json.loads(first.content)['info']['title'], schema.TITLE)
+            self.assertEqual(self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+            self.client.get('/swagger/')
+        self.assertEqual(get_schema.call_count, 1)
+
+
+class ReadinessTests(TestCase):
+    """/readyz: 503 до прогрева и при упавшем шаге, 200 после всех шагов; неизвестный шаг — ошибка конфигурации."""
+
+    def setUp(self):
+        self.calls = []
+        self.fail = True
+        self.warmup = warmup.WarmUp({'first': lambda: self.calls.append('first'), 'second': self.second})
+        patcher = mock.patch('myapp.warmup.warmup', self.warmup)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def second(self):
+        self.calls.append('second')
+        if self.fail:
+            raise RuntimeError('not yet')
+
+    @override_settings(WARMUP_STEPS=['first', 'second'])
+    def test_ready_after_all_steps(self):
+        with self.assertLogs('myapp.warmup', 'ERROR'):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(list(response.json()['steps']), ['first'])
+        self.assertIn('not yet', response.json()['errors']['second'])
+
+        # Упавший шаг повторяется, прошедший — нет
+        self.fail = False
+        with self.assertLogs('myapp.warmup', 'INFO'):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'], {})
+        self.assertEqual(self.calls, ['first', 'second', 'second'])
+        self.assertEqual(self.client.get('/readyz').status_code, 200)
+        self.assertEqual(len(self.calls), 3)
+
+    @override_settings(WARMUP_STEPS=['first', 'bogus'], WARMUP_ON_START=False)
+    def test_unknown_step(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'bogus'):
+            warmup.on_start()
+        with self.assertRaises(ImproperlyConfigured):
+            self.warmup.run()
+        self.assertEqual(self.calls, [])
+
+    @override_settings(WARMUP_STEPS=['urls', 'serializers', 'password_validators', 'authentication'])
+    def test_default_steps(self):
+        with self.assertLogs('myapp.warmup', 'INFO') as logs:
+            self.assertTrue(warmup.WarmUp().run())
+        self.assertIn('Warm-up finished', logs.output[0])
+
+
+class CategoryNameCacheTests(TestCase):
+    """Кэш имя -> id категорий: LRU, TTL, промахи не кэшируются, сброс сигналами Category."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        cls.work, cls.home, cls.misc = (Category.objects.create(name=name) for name in ('work', 'home', 'misc'))
+
+    def setUp(self):
+        category_names.clear()
+        self.addCleanup(category_names.clear)
+        # Внутри транзакции теста кэш ничего не запоминает
+        patcher = mock.patch('myapp.categories.connection')
+        self.connection = patcher.start()
+        self.connection.in_atomic_block = False
+        self.addCleanup(patcher.stop)
+
+    def test_lru_eviction(self):
+        cache = CategoryNameCache(max_size=2, ttl=60)
+        cache.resolve(['work', 'home'])
+        cache.resolve(['work'])  # home теперь самая старая
+        cache.resolve(['misc'])
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.resolve(['work', 'misc']), {'work': self.work.pk, 'misc': self.misc.pk})
+        with self.assertNumQueries(1):
+            cache.resolve(['home'])
+
+    def test_ttl(self):
+        cache = CategoryNameCache(max_size=10, ttl=60)
+        cache.resolve(['work'])
+        with self.assertNumQueries(0):
+            cache.resolve(['work'])
+        with mock.patch('myapp.categories.time.monotonic', return_value=time.monotonic() + 61), \
+                self.assertNumQueries(1):
+            self.assertEqual(cache.resolve(['work']), {'work': self.work.pk})
+
+    def test_misses_and_transactions_are_not_cached(self):
+        cache = CategoryNameCache(max_size=10, ttl=60)
+        self.assertEqual(cache.resolve(['new']), {})
+        created = Category.objects.create(name='new')
+        self.assertEqual(cache.resolve(['new']), {'new': created.pk})
+
+        self.connection.in_atomic_block = True
+        cache.resolve(['home'])
+        with self.assertNumQueries(1):
+            cache.resolve(['home'])
+
+    def test_rename_and_soft_delete_invalidate(self):
+        category_names.resolve(['work', 'home'])
+        self.work.name = 'job'
+        self.work.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(category_names.resolve(['work', 'job']), {'job': self.work.pk})
+
+        self.home.delete()  # мягкое удаление
+        self.assertEqual(category_names.resolve(['home']), {})
+
+    def test_bulk_resolves_names_in_one_query(self):
+        view = TaskBulkView()
+        items = [(0, {'categories': ['work', 'home']}), (1, {'categories': ['misc', 'work', 'nope']}),
+                 (2, {'title': 'no categories'})]
+        with self.assertNumQueries(1):
+            errors = view.resolve_relations(items)
+        self.assertEqual(items[0][1]['categories'], [self.work.pk, self.home.pk])
+        self.assertEqual(errors, {1: {'categories': ['Object with name=nope does not exist.']}})
+        with self.assertNumQueries(0):
+            view.resolve_relations([(0, {'categories': ['work', 'home']})])
+
+
+class DeletedCategoriesTests(TestCase):
+    """Корзина категорий: categories/deleted/ постранично и purge_deleted_categories."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.live = Category.objects.create(name='live')
+        now = timezone.now()
+        cls.old = []
+        for i in range(5):
+            category = Category.objects.create(name=f'old {i}')
+            category.delete()
+            cls.old.append(category)
+        # Две пары с одинаковым deleted_at — порядок внутри решает id
+        for category, days in zip(cls.old, (40, 40, 50, 50, 60)):
+            Category.all_objects.filter(pk=category.pk).update(deleted_at=now - timedelta(days=days))
+        cls.recent = Category.objects.create(name='recent')
+        cls.recent.delete()
+        Category.all_objects.filter(pk=cls.recent.pk).update(deleted_at=now - timedelta(days=5))
+
+    def purge(self, *args):
+        output = StringIO()
+        call_command('purge_deleted_categories', *args, stdout=output)
+        return output.getvalue()
+
+    def remaining(self):
+        return set(Category.all_objects.values_list('name', flat=True))
+
+    def test_deleted_pages(self):
+        response = self.client.get('/api/categories/deleted/')
+        self.assertEqual(response.status_code, 200)
+        old = self.old
+        expected = [self.recent, old[1], old[0], old[3], old[2], old[4]]
+        self.assertEqual([row['id'] for row in response.data['results']], [c.pk for c in expected[:5]])
+        self.assertIsNotNone(response.data['next'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [old[4].pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_dry_run(self):
+        self.assertIn('5 categor(ies) would be purged', self.purge('--dry-run'))
+        self.assertEqual(len(self.remaining()), 7)
+
+    def test_batches_and_archive(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        archive = os.path.join(directory, 'categories.ndjson')
+        output = self.purge('--batch-size', '2', '--archive', archive, '--verbosity', '2')
+        self.assertIn('Purged 2...\nPurged 4...\nPurged 5...', output)
+        self.assertIn('Purged 5 categor(ies)', output)
+        self.assertEqual(self.remaining(), {'live', 'recent'})
+
+        with open(archive, encoding='utf-8') as file:
+            rows = [json.loads(line) for line in file]
+        # Старые первыми, как в частичном индексе (deleted_at, id)
+        old = self.old
+        self.assertEqual([row['name'] for row in rows], [c.name for c in (old[4], old[2], old[3], old[0], old[1])])
+        self.assertEqual(set(rows[0]), {'id', 'name', 'deleted_at', 'task_count'})
+
+    def test_cutoff(self):
+        self.purge('--days', '55')
+        self.assertEqual(len(self.remaining()), 6)
+        self.purge('--days', '3')
+        self.assertEqual(self.remaining(), {'live'})
+
+
+class LogRequestMiddlewareTests(TestCase):
+    """Строка лога запроса с полями в extra — в WSGI- и в ASGI-цепочке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alex', password='secret')
+        Task.objects.create(title='t', owner=cls.user)
+
+    def setUp(self):
+        self.auth = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+
+    def check_record(self, record):
+        self.assertEqual((record.method, record.path, record.status, record.route, record.user_id),
+                         ('GET', '/api/tasks/?status=New', 200, 'task_list_create', self.user.pk))
+        self.assertGreater(record.bytes, 0)
+        self.assertGreaterEqual(record.duration_ms, 0)
+        self.assertGreater(record.db_queries, 0)
+        self.assertIn('route=task_list_create', record.getMessage())
+
+    def test_sync(self):
+        with self.assertLogs('http_logger', 'INFO') as logs:
+            Client().get('/api/tasks/?status=New', HTTP_AUTHORIZATION=self.auth)
+        self.check_record(logs.records[-1])
+
+    async def test_async(self):
+        with mock.patch.object(LogRequestMiddleware, '__acall__', autospec=True,
+                               side_effect=LogRequestMiddleware.__acall__) as acall, \
+                self.assertLogs('http_logger', 'INFO') as logs:
+            await AsyncClient().get('/api/tasks/?status=New', headers={'Authorization': self.auth})
+        acall.assert_called_once()  # асинхронный путь, без перехода в поток
+        self.check_record(logs.records[-1])
+
+
+class BackgroundFileHandlerTests(SimpleTestCase):
+    """Запись в файл из фонового потока, ограниченная очередь, новый писатель после fork."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'test.log')
+
+    def record(self, message, *args):
+        return logging.LogRecord('test', logging.INFO, __file__, 1, message, args, None)
+
+    def lines(self):
+        with open(self.path, encoding='utf-8') as file:
+            return file.read().splitlines()
+
+    def test_writes_formatted_records(self):
+        handler = BackgroundFileHandler(self.path)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        handler.handle(self.record('first %s', 1))
+        handler.handle(self.record('second'))
+        handler.close()  # дописывает очередь
+        self.assertEqual(self.lines(), ['INFO first 1', 'INFO second'])
+
+    def test_full_queue_drops(self):
+        handler = BackgroundFileHandler(self.path, queue_size=2)
+        self.addCleanup(handler.target.close)
+        with mock.patch('myapp.log_handlers.QueueListener'):  # писатель стоит — очередь не разбирается
+            for i in range(5):
+                handler.handle(self.record(f'record {i}'))
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(handler.queue.qsize(), 2)
+
+    def test_restarts_listener_after_fork(self):
+        handler = BackgroundFileHandler(self.path)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.handle(self.record('parent'))
+        parent_listener = handler.listener
+        parent_listener.stop()  # в дочернем процессе потока родителя уже нет
+
+        with mock.patch('myapp.log_handlers.os.getpid', return_value=os.getpid() + 1):
+            handler.handle(self.record('child'))
+            self.assertIsNot(handler.listener, parent_listener)
+            handler.close()
+        self.assertEqual(self.lines(), ['parent', 'child'])
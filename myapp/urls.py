@@ -4,6 +4,7 @@ from django.urls import path, include
 from . import views
 from rest_framework.routers import DefaultRouter
 from myapp.views import MyTasksView, RegisterView, LogoutView
+from myapp.sync import ChangesView
 
 
 router = DefaultRouter()
@@ -15,14 +16,21 @@ urlpatterns = [
 
     # Tasks
     path('tasks/', views.TaskListCreateView.as_view(), name='task_list_create'),
+    path('tasks/export/', views.TaskExportView.as_view(), name='task_export'),
+    path('tasks/bulk/', views.TaskBulkView.as_view(), name='task_bulk'),
     path('tasks/<int:pk>/', views.TaskRetrieveUpdateDestroyView.as_view(), name='task_detail_update_delete'),
     path('tasks/stats/', views.TaskStatsView.as_view(), name='task_stats'),
     path('tasks/my/', MyTasksView.as_view(), name='my-tasks'),
 
     # SubTasks
     path('subtasks/', views.SubTaskListCreateView.as_view(), name='subtask_list_create'),
+    path('subtasks/export/', views.SubTaskExportView.as_view(), name='subtask_export'),
+    path('subtasks/bulk/', views.SubTaskBulkView.as_view(), name='subtask_bulk'),
     path('subtasks/<int:pk>/', views.SubTaskRetrieveUpdateDestroyView.as_view(), name='subtask_detail_update_delete'),
 
+    # Дельта-синхронизация задач и подзадач
+    path('changes/', ChangesView.as_view(), name='changes'),
+
     # Категории через ViewSet
     path('', include(router.urls)),
 
@@ -0,0 +1,179 @@
+# myapp/versions.py
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+
+from myapp.models import OwnerVersion
+
+_pending = ContextVar('owner_version_pending', default=None)
+
+
+class _Batch:
+    def __init__(self):
+        self.owner_ids = set()
+        self.task_ids = set()
+        self.allocated = {}  # owner_id -> версия, выданная в этом блоке
+        self.tombstones = []
+
+
+@contextmanager
+def batch():
+    """
+    Внутри блока у каждого владельца одна новая версия на все изменения,
+    надгробия пишутся одним bulk_create, остальные версии поднимаются один раз при выходе.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+    pending = _Batch()
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    if pending.tombstones:
+        from myapp.models import Tombstone
+        Tombstone.objects.bulk_create(pending.tombstones, batch_size=500)
+    _bump((pending.owner_ids | _task_owners(pending.task_ids)) - set(pending.allocated))
+
+
+def allocate(owner_id):
+    """
+    Новая версия владельца для штампа sync_version.
+    Вызывать в транзакции, которая пишет саму строку: UPDATE блокирует строку
+    OwnerVersion до коммита, поэтому версии одного владельца коммитятся по порядку
+    и клиент дельта-синхронизации не пропустит изменение с меньшей версией.
+    """
+    pending = _pending.get()
+    if pending is not None and owner_id in pending.allocated:
+        return pending.allocated[owner_id]
+
+    now = timezone.now()
+    with transaction.atomic():
+        if not OwnerVersion.objects.filter(owner_id=owner_id).update(version=F('version') + 1, updated_at=now):
+            try:
+                with transaction.atomic():
+                    OwnerVersion.objects.create(owner_id=owner_id, version=1, updated_at=now)
+            except IntegrityError:
+                OwnerVersion.objects.filter(owner_id=owner_id).update(version=F('version') + 1, updated_at=now)
+        version = OwnerVersion.objects.filter(owner_id=owner_id).values_list('version', flat=True).get()
+
+    if pending is not None:
+        pending.allocated[owner_id] = version
+    return version
+
+
+def bump(owner_ids):
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    pending = _pending.get()
+    if pending is not None:
+        pending.owner_ids.update(owner_ids)
+        return
+    _bump(owner_ids)
+
+
+def bump_for_tasks(task_ids):
+    """Поднимает версии владельцев задач (например, при изменении подзадач чужой задачи)."""
+    task_ids = {task_id for task_id in task_ids if task_id is not None}
+    pending = _pending.get()
+    if pending is not None:
+        pending.task_ids.update(task_ids)
+        return
+    _bump(_task_owners(task_ids))
+
+
+def touch_tasks(task_ids):
+    """
+    Отмечает задачи изменёнными (updated_at, sync_version), когда меняется не сама строка,
+    а её представление — связи с категориями, имя категории.
+    """
+    from myapp.models import Task
+
+    by_owner = defaultdict(list)
+    for pk, owner_id in Task.objects.filter(pk__in=task_ids).values_list('pk', 'owner_id'):
+        by_owner[owner_id].append(pk)
+    now = timezone.now()
+    with transaction.atomic():
+        for owner_id, ids in by_owner.items():
+            Task.objects.filter(pk__in=ids).update(sync_version=allocate(owner_id), updated_at=now)
+
+
+def record_deletion(instance, kind):
+    """Надгробие для дельта-синхронизации: удалённый объект с новой версией владельца."""
+    from myapp.models import Tombstone
+
+    tombstone = Tombstone(owner_id=instance.owner_id, kind=kind, object_id=instance.pk,
+                          version=allocate(instance.owner_id))
+    pending = _pending.get()
+    if pending is not None:
+        pending.tombstones.append(tombstone)
+    else:
+        tombstone.save()
+
+
+def deleted_owner_ids(origin):
+    """
+    Id пользователей, чьё удаление каскадом удаляет объект (origin из post_delete).
+    Для них версии и надгробия не пишутся: строки OwnerVersion/Tombstone
+    сослались бы на удаляемого пользователя.
+    """
+    from django.contrib.auth import get_user_model
+
+    user_model = get_user_model()
+    if isinstance(origin, user_model):
+        return {origin.pk}
+    if isinstance(origin, QuerySet) and origin.model is user_model:
+        if not hasattr(origin, '_deleted_owner_ids'):
+            origin._deleted_owner_ids = set(origin.values_list('pk', flat=True))
+        return origin._deleted_owner_ids
+    return set()
+
+
+def _task_owners(task_ids):
+    from myapp.models import Task
+
+    if not task_ids:
+        return set()
+    return set(Task.objects.filter(pk__in=task_ids).values_list('owner_id', flat=True))
+
+
+def _bump(owner_ids):
+    if not owner_ids:
+        return
+    now = timezone.now()
+    updated = OwnerVersion.objects.filter(owner_id__in=owner_ids).update(version=F('version') + 1, updated_at=now)
+    if updated < len(owner_ids):
+        existing = set(OwnerVersion.objects.filter(owner_id__in=owner_ids).values_list('owner_id', flat=True))
+        OwnerVersion.objects.bulk_create(
+            [OwnerVersion(owner_id=owner_id, version=1, updated_at=now) for owner_id in owner_ids - existing],
+            ignore_conflicts=True,
+        )
+
+
+def get_version(owner_id):
+    """(version, updated_at) владельца или (0, None), если он ещё ничего не менял."""
+    row = OwnerVersion.objects.filter(owner_id=owner_id).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def get_version_by_task(task_id):
+    """
+    Версия владельца задачи — один запрос: строка задачи по первичному ключу и одно
+    соединение с OwnerVersion по owner_id (ORM добавил бы ещё и auth_user).
+    """
+    from myapp.models import Task
+
+    task_table, version_table = Task._meta.db_table, OwnerVersion._meta.db_table
+    rows = list(OwnerVersion.objects.raw(
+        f'SELECT t.owner_id, v.version, v.updated_at FROM {task_table} t '
+        f'LEFT JOIN {version_table} v ON v.owner_id = t.owner_id WHERE t.id = %s',
+        [task_id],
+    ))
+    if not rows:
+        return None, (0, None)
+    return rows[0].owner_id, (rows[0].version or 0, rows[0].updated_at)
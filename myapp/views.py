@@ -9,17 +9,27 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from myapp.models import Task, SubTask, Category
 from myapp.serializers import (TaskSerializer, SubTaskCreateSerializer,
-                               TaskDetailSerializer, CategoryCreateSerializer)
-from django.utils import timezone
-from django.db.models import Count
+                               TaskDetailSerializer, CategoryCreateSerializer,
+                               TaskBulkSerializer, SubTaskBulkSerializer,
+                               TaskValuesSerializer, SubTaskValuesSerializer)
+from collections import defaultdict
 from datetime import datetime
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.views import APIView
 from myapp.permissions import IsOwnerOrReadOnly
+from myapp.pagination import MyCursorPagination
+from myapp.mixins import (ConditionalGetMixin, EagerLoadingViewMixin, OwnerScopedMixin, QueryBudgetMixin,
+                          ValuesListMixin)
+from myapp.filters import FullTextSearchFilter
+from myapp import categories, stats, versions
+from myapp.categories import category_names
+from myapp.stats import get_task_stats
+from myapp.bulk import BulkWriteView
+from myapp.export import ExportView
 from django.contrib.auth.models import User
 from myapp.serializers import RegisterSerializer
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from myapp.blacklist import RefreshToken
 
 
 def hello_alex(request):
@@ -42,22 +52,28 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
 
-class MyTasksView(APIView):
+class MyTasksView(ConditionalGetMixin, QueryBudgetMixin, ValuesListMixin, EagerLoadingViewMixin,
+                  generics.ListAPIView):
+    serializer_class = TaskSerializer
+    values_serializer_class = TaskValuesSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = None  # Все задачи пользователя одним списком
+    query_budget = 4  # пользователь + версия + задачи + категории
 
-    def get(self, request):
-        tasks = Task.objects.filter(owner=request.user).order_by('-created_at')
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        return Task.objects.filter(owner=self.request.user).order_by('-created_at', '-id')
 
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(ConditionalGetMixin, QueryBudgetMixin, ValuesListMixin, EagerLoadingViewMixin,
+                         generics.ListCreateAPIView):
     serializer_class = TaskSerializer
+    values_serializer_class = TaskValuesSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    query_budget = 4  # пользователь + версия + страница задач + категории
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_fields = ['status', 'deadline']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         # Показываем только задачи текущего пользователя
@@ -67,34 +83,100 @@ class TaskListCreateView(generics.ListCreateAPIView):
         # Сохраняем владельца задачи
         serializer.save(owner=self.request.user)
 
-class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class TaskRetrieveUpdateDestroyView(ConditionalGetMixin, QueryBudgetMixin, OwnerScopedMixin, EagerLoadingViewMixin,
+                                    generics.RetrieveUpdateDestroyAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskDetailSerializer
     lookup_field = 'pk'
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    query_budget = 5  # пользователь + версия (вместе с owner_id задачи) + задача + категории + подзадачи
+
+    def get_owner_version(self, request, *args, **kwargs):
+        # Задачу может читать не только владелец — ETag строится по версии её владельца
+        return versions.get_version_by_task(kwargs['pk'])
+
+
+class TaskExportView(ExportView):
+    serializer_class = TaskSerializer
+    filename = 'tasks'
+
+
+class TaskBulkView(BulkWriteView):
+    model = Task
+    serializer_class = TaskBulkSerializer
+
+    def resolve_relations(self, valid_items):
+        # Все имена категорий пакета — через кэш, промахи одним запросом
+        names = {name for _, data in valid_items for name in data.get('categories', [])}
+        found = category_names.resolve(names) if names else {}
+        errors = {}
+        for index, data in valid_items:
+            if 'categories' not in data:
+                continue
+            missing = [name for name in data['categories'] if name not in found]
+            if missing:
+                errors[index] = {'categories': [f'Object with name={name} does not exist.' for name in missing]}
+            else:
+                data['categories'] = list(dict.fromkeys(found[name] for name in data['categories']))
+        return errors
+
+    def assign(self, instance, data):
+        data = {field: value for field, value in data.items() if field != 'categories'}
+        return super().assign(instance, data)
+
+    def snapshot(self, instance):
+        return stats.snapshot(instance)
+
+    def after_create(self, instances, items, signals_sent):
+        if not signals_sent:
+            stats.record_changes([None] * len(instances), [stats.snapshot(task) for task in instances])
+        self.set_categories(instances, items)
+
+    def after_update(self, instances, items, old_states):
+        stats.record_changes(old_states, [stats.snapshot(task) for task in instances])
+        self.set_categories(instances, items, replace=True)
+
+    def perform_bulk_delete(self, queryset):
+        # Сигналы удаления копятся и применяются к TaskStats одним набором запросов
+        with stats.batch():
+            queryset.delete()
+
+    def set_categories(self, instances, items, replace=False):
+        # Связи пишутся напрямую, без m2m_changed — счётчики категорий правим сами
+        through = Task.categories.through
+        links = [(task, data['categories']) for task, (_, data) in zip(instances, items) if 'categories' in data]
+        if not links:
+            return
+        deltas = defaultdict(int)
+        if replace:
+            old_links = through.objects.filter(task_id__in=[task.pk for task, _ in links])
+            for category_id, count in categories.link_counts(old_links).items():
+                deltas[category_id] -= count
+            old_links.delete()
+        rows = [through(task_id=task.pk, category_id=category_id) for task, category_ids in links
+                for category_id in category_ids]
+        through.objects.bulk_create(rows, batch_size=self.batch_size)
+        for row in rows:
+            deltas[row.category_id] += 1
+        categories.adjust_task_counts(deltas)
 
 
 class TaskStatsView(generics.GenericAPIView):
     def get(self, request):
-        total_tasks = Task.objects.count()
-        status_counts = Task.objects.values('status').annotate(count=Count('status'))
-        overdue_tasks = Task.objects.filter(deadline__lt=timezone.now(),
-                                            status__in=['New', 'In progress', 'Pending', 'Blocked']).count()
-        stats = {
-            "total_tasks": total_tasks,
-            "status_counts": {item['status']: item['count'] for item in status_counts},
-            "overdue_tasks": overdue_tasks
-        }
-        return Response(stats)
+        # Счётчики поддерживаются сигналами (myapp/stats.py) — здесь только чтение по ключу
+        stats = get_task_stats()
+        return Response(stats.as_dict())
 
-class SubTaskListCreateView(generics.ListCreateAPIView):
+class SubTaskListCreateView(QueryBudgetMixin, ValuesListMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     serializer_class = SubTaskCreateSerializer
+    values_serializer_class = SubTaskValuesSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    query_budget = 2  # пользователь + страница подзадач
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_fields = ['status', 'deadline']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         # Показываем только подзадачи текущего пользователя
@@ -116,7 +198,36 @@ class SubTaskListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class SubTaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class SubTaskExportView(ExportView):
+    serializer_class = SubTaskCreateSerializer
+    filename = 'subtasks'
+
+
+class SubTaskBulkView(BulkWriteView):
+    model = SubTask
+    serializer_class = SubTaskBulkSerializer
+
+    def resolve_relations(self, valid_items):
+        task_ids = {data['task'] for _, data in valid_items if 'task' in data}
+        existing = set(Task.objects.filter(pk__in=task_ids).values_list('pk', flat=True)) if task_ids else set()
+        return {
+            index: {'task': [f'Invalid pk "{data["task"]}" - object does not exist.']}
+            for index, data in valid_items
+            if 'task' in data and data['task'] not in existing
+        }
+
+    def bump_versions(self, instances):
+        super().bump_versions(instances)
+        versions.bump_for_tasks({subtask.task_id for subtask in instances})
+
+    def assign(self, instance, data):
+        data = dict(data)
+        if 'task' in data:
+            data['task_id'] = data.pop('task')
+        return super().assign(instance, data)
+
+
+class SubTaskRetrieveUpdateDestroyView(OwnerScopedMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = SubTask.objects.all()
     serializer_class = SubTaskCreateSerializer
     lookup_field = 'pk'
@@ -127,26 +238,34 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategoryCreateSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
-    ordering_fields = ['name', 'id']
+    ordering_fields = ['name', 'id', 'task_count']
     ordering = ['name']
 
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # POST существующего имени ничего не создаёт — 200 с этой категорией
+        if not response.data.serializer.instance.created:
+            response.status_code = status.HTTP_200_OK
+        return response
+
     @action(detail=False, methods=['get'])
     def count_tasks(self, request):
-        categories = self.get_queryset().annotate(task_count=Count('task'))
-        serializer = self.get_serializer(categories, many=True)
-        data = [
-            {
-                'id': category['id'],
-                'name': category['name'],
-                'task_count': category['task_count']
-            }
-            for category in serializer.data
-        ]
-        return Response(data)
+        # task_count — столбец Category (поддерживается сигналами), по умолчанию самые популярные первыми
+        queryset = self.get_queryset()
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-task_count', 'name')
+        else:
+            queryset = OrderingFilter().filter_queryset(request, queryset, self)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def deleted(self, request):
+        # Постранично, недавно удалённые первыми — по частичному индексу (deleted_at, id)
         deleted_categories = Category.all_objects.filter(is_deleted=True)
-        serializer = self.get_serializer(deleted_categories, many=True)
-        return Response(serializer.data)
+        paginator = MyCursorPagination()
+        paginator.ordering = ('-deleted_at', '-id')
+        page = paginator.paginate_queryset(deleted_categories, request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
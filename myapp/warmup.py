@@ -0,0 +1,129 @@
+# myapp/warmup.py
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+logger = logging.getLogger('myapp.warmup')
+
+# Сериализаторы, поля которых строятся на первых запросах к API
+SERIALIZERS = (
+    'myapp.serializers.TaskSerializer',
+    'myapp.serializers.TaskDetailSerializer',
+    'myapp.serializers.SubTaskCreateSerializer',
+    'myapp.serializers.RegisterSerializer',
+)
+
+
+def warm_urls():
+    # Импорт ROOT_URLCONF и таблица reverse(): первый reverse() строит её целиком (с ней — регистрация админки)
+    reverse('readiness')
+
+
+def warm_database():
+    # Драйвер, DNS, авторизация; соединение закрываем — прогрев может идти до fork (gunicorn --preload)
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.close()
+
+
+def warm_serializers():
+    for path in SERIALIZERS:
+        serializer = import_string(path)(context={})
+        serializer.fields  # noqa: B018  строит поля по модели
+
+
+def warm_password_validators():
+    # CommonPasswordValidator распаковывает список паролей в конструкторе; результат кэшируется
+    from django.contrib.auth.password_validation import get_default_password_validators
+
+    get_default_password_validators()
+
+
+def warm_authentication():
+    from rest_framework.settings import api_settings
+
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authentication_class()
+
+
+STEPS = {
+    'urls': warm_urls,
+    'database': warm_database,
+    'serializers': warm_serializers,
+    'password_validators': warm_password_validators,
+    'authentication': warm_authentication,
+}
+
+
+class WarmUp:
+    """
+    Прогрев ленивого состояния до приёма трафика: шаги WARMUP_STEPS по порядку.
+    Запускается из wsgi.py/asgi.py (WARMUP_ON_START) или пробой готовности;
+    готов — когда все шаги прошли. Упавший шаг повторяется при следующем запуске.
+    """
+
+    def __init__(self, steps=STEPS):
+        self.steps = steps
+        self.done = {}  # имя шага -> мс
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def step_names(self):
+        """WARMUP_STEPS; неизвестный шаг — ошибка конфигурации, а не вечный 503."""
+        names = getattr(settings, 'WARMUP_STEPS', list(self.steps))
+        unknown = [name for name in names if name not in self.steps]
+        if unknown:
+            raise ImproperlyConfigured(
+                f'Unknown WARMUP_STEPS: {", ".join(unknown)}. Available: {", ".join(self.steps)}.')
+        return names
+
+    @property
+    def ready(self):
+        return all(name in self.done for name in self.step_names())
+
+    def run(self):
+        with self._lock:
+            for name in self.step_names():
+                if name in self.done:
+                    continue
+                start = time.perf_counter()
+                try:
+                    self.steps[name]()
+                except Exception as exc:
+                    self.errors[name] = repr(exc)
+                    logger.exception('Warm-up step %s failed', name)
+                    continue
+                self.errors.pop(name, None)
+                self.done[name] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info('Warm-up %s: %s', 'finished' if self.ready else 'incomplete', self.done)
+        return self.ready
+
+
+warmup = WarmUp()
+
+
+def on_start():
+    """Вызов из wsgi.py / asgi.py после создания приложения."""
+    warmup.step_names()  # ошибка в WARMUP_STEPS — при старте, даже без прогрева
+    if getattr(settings, 'WARMUP_ON_START', True):
+        warmup.run()
+
+
+@require_safe
+def readiness_view(request):
+    """Проба готовности: 200 после прогрева, иначе 503 (и попытка догреть)."""
+    ready = warmup.ready or warmup.run()
+    return JsonResponse(
+        {'status': 'ready' if ready else 'warming', 'steps': warmup.done, 'errors': warmup.errors},
+        status=200 if ready else 503,
+    )